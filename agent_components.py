@@ -0,0 +1,526 @@
+"""
+Nexa Search Agent Components
+LangChain-bound pieces of the engine: callback handlers, the scheduled Groq
+client and the caching tool wrapper. Kept apart from agent_engine so that
+importing the engine (and constructing it) stays fast; this module and the
+LangChain stack load on first use.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Optional, List, Dict, Any, Tuple
+from contextlib import contextmanager
+from langchain_groq import ChatGroq
+from langchain_core.tools import BaseTool, ToolException
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent_engine import (
+    _observation_packer,
+    _source_limiters,
+    _request_deadline,
+    _check_deadline,
+    _run_with_deadline,
+    _await_with_deadline,
+)
+
+
+class FinalAnswerFilter:
+    """
+    Splits one ReAct LLM generation into answer and scaffolding text
+
+    Tokens before the "Final Answer:" marker (Thought/Action/Action Input)
+    are scaffolding; everything after it is answer. The marker may arrive
+    split across tokens, so a tail that could still begin the marker is
+    held back until the next token decides it.
+    """
+    
+    MARKER = "Final Answer:"
+    
+    def __init__(self, marker: str = MARKER):
+        self.marker = marker
+        self.in_answer = False
+        self._pending = ""
+        self._answer_started = False
+    
+    def feed(self, token: str) -> Tuple[str, str]:
+        """Returns (answer text, scaffolding text) released by this token"""
+        if self.in_answer:
+            return self._answer(token), ""
+        
+        self._pending += token
+        index = self._pending.find(self.marker)
+        if index >= 0:
+            scaffolding = self._pending[:index + len(self.marker)]
+            rest = self._pending[index + len(self.marker):]
+            self._pending = ""
+            self.in_answer = True
+            return self._answer(rest), scaffolding
+        
+        # Hold back the longest tail that is a prefix of the marker
+        keep = 0
+        for size in range(min(len(self.marker) - 1, len(self._pending)), 0, -1):
+            if self._pending.endswith(self.marker[:size]):
+                keep = size
+                break
+        released = self._pending[:len(self._pending) - keep]
+        self._pending = self._pending[len(self._pending) - keep:]
+        return "", released
+    
+    def flush(self) -> str:
+        """End of generation: any held-back text was scaffolding"""
+        scaffolding, self._pending = self._pending, ""
+        return scaffolding
+    
+    def _answer(self, text: str) -> str:
+        if not self._answer_started:
+            text = text.lstrip()
+            self._answer_started = bool(text)
+        return text
+
+
+class SearchEventHandler(BaseCallbackHandler):
+    """
+    Turns agent callbacks into typed stream events
+
+    Events are dicts with a "type" key:
+      {"type": "token", "text": ...}
+      {"type": "scaffold", "text": ...}
+      {"type": "tool_start", "tool": ..., "input": ...}
+      {"type": "tool_end", "tool": ..., "elapsed": ..., "error": None | str}
+    The engine adds "final" and "error" events around these (see
+    NexaSearchEngine.search_stream).
+    
+    With answer_only (agent runs), "token" carries only Final Answer text
+    and the ReAct scaffolding goes to "scaffold" events, which text
+    renderers ignore; it is also kept in `scaffolding` for debugging.
+    Plain synthesis calls have no marker and pass answer_only=False.
+    """
+
+    def __init__(self, event_callback, answer_only: bool = True):
+        self.event_callback = event_callback
+        self.answer_only = answer_only
+        self.scaffolding = []
+        self._tool_starts = {}
+        self._filters = {}
+
+    def on_llm_new_token(self, token: str, *, run_id=None, **kwargs) -> None:
+        if not self.answer_only:
+            self.event_callback({"type": "token", "text": token})
+            return
+        answer_filter = self._filters.setdefault(run_id, FinalAnswerFilter())
+        answer, scaffolding = answer_filter.feed(token)
+        if scaffolding:
+            self._scaffold(scaffolding)
+        if answer:
+            self.event_callback({"type": "token", "text": answer})
+
+    def on_llm_end(self, response: Any, *, run_id=None, **kwargs) -> None:
+        answer_filter = self._filters.pop(run_id, None)
+        if answer_filter is not None:
+            scaffolding = answer_filter.flush()
+            if scaffolding:
+                self._scaffold(scaffolding)
+
+    def _scaffold(self, text: str):
+        self.scaffolding.append(text)
+        self.event_callback({"type": "scaffold", "text": text})
+
+    def on_llm_error(self, error: BaseException, *, run_id=None, **kwargs) -> None:
+        self.on_llm_end(None, run_id=run_id)
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id=None, **kwargs) -> None:
+        self.tool_started(serialized.get("name", "Unknown"), input_str, run_id)
+
+    def on_tool_end(self, output: Any, *, run_id=None, **kwargs) -> None:
+        self.tool_finished(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id=None, **kwargs) -> None:
+        self.tool_finished(run_id, error=str(error) or type(error).__name__)
+
+    def tool_started(self, tool_name: str, tool_input: str, run_id: Any):
+        """Report a tool call; also used directly by the parallel fan-out"""
+        self._tool_starts[run_id] = (tool_name, time.monotonic())
+        self.event_callback({"type": "tool_start", "tool": tool_name, "input": tool_input})
+
+    def tool_finished(self, run_id: Any, error: Optional[str] = None):
+        start = self._tool_starts.pop(run_id, None)
+        if start is None:
+            return
+        tool_name, started = start
+        self.event_callback({
+            "type": "tool_end",
+            "tool": tool_name,
+            "elapsed": round(time.monotonic() - started, 3),
+            "error": error,
+        })
+
+
+class SearchTraceHandler(BaseCallbackHandler):
+    """
+    Records tool observations and per-stage timings for one search
+
+    The observations let a search that runs out of budget still synthesize
+    an answer from what has arrived; the timings are returned with the
+    result as `timings`.
+    """
+    
+    def __init__(self):
+        self.started = time.monotonic()
+        self.steps = []  # (tool, tool input, observation)
+        self.stages = []  # {"stage": ..., "elapsed": ...}
+        self.rerank = None  # PassageReranker stats when an answer was synthesized
+        self._llm_starts = {}
+        self._tool_starts = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, elapsed: float):
+        with self._lock:
+            self.stages.append({"stage": stage, "elapsed": round(elapsed, 3)})
+    
+    @contextmanager
+    def stage(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+    
+    def on_llm_start(self, serialized: dict, prompts: List[str], *, run_id=None, **kwargs) -> None:
+        self._llm_starts[run_id] = time.monotonic()
+    
+    def on_llm_end(self, response: Any, *, run_id=None, **kwargs) -> None:
+        started = self._llm_starts.pop(run_id, None)
+        if started is not None:
+            self.record("llm", time.monotonic() - started)
+    
+    def on_llm_error(self, error: BaseException, *, run_id=None, **kwargs) -> None:
+        self.on_llm_end(None, run_id=run_id)
+    
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id=None, **kwargs) -> None:
+        self._tool_starts[run_id] = (serialized.get("name", "Unknown"), input_str, time.monotonic())
+    
+    def on_tool_end(self, output: Any, *, run_id=None, **kwargs) -> None:
+        start = self._tool_starts.pop(run_id, None)
+        if start is not None:
+            tool_name, tool_input, started = start
+            self.record(f"tool:{tool_name}", time.monotonic() - started)
+            with self._lock:
+                self.steps.append((tool_name, tool_input, str(output)))
+    
+    def on_tool_error(self, error: BaseException, *, run_id=None, **kwargs) -> None:
+        start = self._tool_starts.pop(run_id, None)
+        if start is not None:
+            tool_name, _, started = start
+            self.record(f"tool:{tool_name}", time.monotonic() - started)
+    
+    def observations(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [(tool_name, observation) for tool_name, _, observation in self.steps]
+    
+    def timings(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = list(self.stages)
+        totals = {}
+        for entry in stages:
+            kind = entry["stage"].split(":", 1)[0]
+            totals[kind] = round(totals.get(kind, 0.0) + entry["elapsed"], 3)
+        return {
+            "total": round(time.monotonic() - self.started, 3),
+            **totals,
+            "stages": stages,
+        }
+
+
+_model_switch_lock = threading.Lock()
+
+
+class ScheduledChatGroq(ChatGroq):
+    """
+    ChatGroq whose requests go through the RequestScheduler
+
+    Calls also honor the current search deadline: the remaining budget is
+    passed to the Groq client as the request timeout, and a stream is cut
+    off once the deadline passes. If a request fails because the model is
+    unavailable, the client switches in place to the next fallback model
+    and retries, so every agent sharing it follows along.
+    """
+    
+    scheduler: Any = None
+    expected_output_tokens: int = 256
+    fallback_models: List[str] = []
+    on_model_switch: Any = None
+    
+    @staticmethod
+    def is_model_unavailable(error: Exception) -> bool:
+        """Recognize Groq errors for missing or decommissioned models"""
+        status = getattr(error, "status_code", None)
+        message = str(error).lower()
+        if status == 404:
+            return True
+        return "model" in message and any(
+            marker in message
+            for marker in ("decommissioned", "not found", "does not exist", "model_not_found")
+        )
+    
+    def _fail_over(self, error: Exception) -> bool:
+        """Switch to the next fallback model; False if there is none"""
+        if not self.is_model_unavailable(error):
+            return False
+        with _model_switch_lock:
+            if self.model_name not in self.fallback_models:
+                return False
+            index = self.fallback_models.index(self.model_name)
+            if index + 1 >= len(self.fallback_models):
+                return False
+            failed_model = self.model_name
+            self.model_name = self.fallback_models[index + 1]
+        print(f"✗ Model {failed_model} unavailable, switching to {self.model_name}")
+        if self.on_model_switch:
+            self.on_model_switch(self.model_name)
+        return True
+    
+    def _cost(self, messages: List[Any]) -> Dict[str, float]:
+        # Rough estimate (~4 characters per token) charged against TPM
+        prompt_chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+        return {"requests": 1, "tokens": prompt_chars / 4 + self.expected_output_tokens}
+    
+    @staticmethod
+    def _with_deadline(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        remaining = _check_deadline()
+        if remaining is not None:
+            kwargs = {**kwargs, "timeout": remaining}
+        return kwargs
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.streaming:
+            # The streaming path is scheduled (and fails over) in _stream
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        while True:
+            call_kwargs = self._with_deadline(kwargs)
+            generate = lambda: super(ScheduledChatGroq, self)._generate(
+                messages, stop=stop, run_manager=run_manager, **call_kwargs
+            )
+            try:
+                if self.scheduler is None:
+                    return generate()
+                return self.scheduler.call("groq", generate, self._cost(messages))
+            except Exception as e:
+                if not self._fail_over(e):
+                    raise
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.streaming:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        while True:
+            call_kwargs = self._with_deadline(kwargs)
+            agenerate = lambda: super(ScheduledChatGroq, self)._agenerate(
+                messages, stop=stop, run_manager=run_manager, **call_kwargs
+            )
+            try:
+                if self.scheduler is None:
+                    return await agenerate()
+                return await self.scheduler.acall("groq", agenerate, self._cost(messages))
+            except Exception as e:
+                if not self._fail_over(e):
+                    raise
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        while True:
+            started = False
+            try:
+                for chunk in self._scheduled_stream(messages, stop, run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                    if _request_deadline.get() is not None:
+                        _check_deadline()
+                return
+            except Exception as e:
+                # Only fail over before any output reached the callbacks
+                if started or not self._fail_over(e):
+                    raise
+    
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        while True:
+            started = False
+            try:
+                async for chunk in self._ascheduled_stream(messages, stop, run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                    if _request_deadline.get() is not None:
+                        _check_deadline()
+                return
+            except Exception as e:
+                if started or not self._fail_over(e):
+                    raise
+    
+    def _scheduled_stream(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = self._with_deadline(kwargs)
+        if self.scheduler is None:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        attempt = 0
+        while True:
+            self.scheduler.acquire("groq", self._cost(messages))
+            stream = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            # A 429 surfaces before the first chunk, so retries never repeat output
+            try:
+                first = next(stream)
+            except StopIteration:
+                return
+            except Exception as e:
+                delay = self.scheduler.retry_delay("groq", e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            yield first
+            yield from stream
+            return
+    
+    async def _ascheduled_stream(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = self._with_deadline(kwargs)
+        if self.scheduler is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        attempt = 0
+        while True:
+            await self.scheduler.aacquire("groq", self._cost(messages))
+            stream = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                delay = self.scheduler.retry_delay("groq", e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            yield first
+            async for chunk in stream:
+                yield chunk
+            return
+
+
+_tool_build_lock = threading.Lock()
+
+
+class CachedTool(BaseTool):
+    """
+    Memoizing wrapper around a search tool
+
+    Observations are keyed on (tool name, normalized input) in a per-tool
+    SearchCache, so the same lookup made from another mode, source mix or a
+    regenerate is served locally instead of hitting the network again.
+    Raw observations are cached, and added to the local document index when
+    one is attached; what the agent sees is packed to the current search's
+    token budget.
+    The wrapped tool itself is only built (and its client library imported)
+    the first time a lookup misses the cache.
+    """
+    
+    factory: Any = None
+    tool: Optional[BaseTool] = None
+    cache: Any = None  # None for tools that are already local
+    index: Any = None  # LocalDocumentIndex that fresh observations are added to
+    handle_tool_error: bool = True
+    scheduler: Any = None
+    backend: Optional[str] = None
+    
+    @staticmethod
+    def _normalize_input(tool_input: str) -> str:
+        """Normalize tool input so trivially different calls share an entry"""
+        return " ".join(str(tool_input).strip().strip("\"'").lower().split())
+    
+    def _run(self, query: str, run_manager: Optional[Any] = None) -> str:
+        """Return the cached observation or run the wrapped tool"""
+        key = self._normalize_input(query)
+        cached = self._cached(key)
+        if cached is not None:
+            return self._pack(cached["observation"])
+        
+        limiter = self._limiter()
+        if limiter is not None:
+            with limiter:
+                observation = self._fetch(query)
+        else:
+            observation = self._fetch(query)
+        self._store(key, observation)
+        return self._pack(observation)
+    
+    def _limiter(self) -> Optional[threading.BoundedSemaphore]:
+        """This tool's concurrency cap for the current batch, if any"""
+        limiters = _source_limiters.get()
+        return limiters.get(self.name) if limiters else None
+    
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        return self.cache.get(key, self.name, [])
+    
+    def _store(self, key: str, observation: str):
+        """Cache a fresh observation and add it to the local index"""
+        if self.cache is not None:
+            self.cache.set(key, self.name, [], {"observation": observation})
+        if self.index is not None:
+            # Written by the index's background thread, off the tool-call path
+            self.index.submit(self.name, key, str(observation))
+    
+    def _pack(self, observation: str) -> str:
+        """Fit the observation into the current search's context budget"""
+        packer = _observation_packer.get()
+        if packer is None:
+            return observation
+        return packer.pack(self.name, str(observation))
+    
+    def _get_tool(self) -> BaseTool:
+        """Build the wrapped tool on first use"""
+        if self.tool is None:
+            with _tool_build_lock:
+                if self.tool is None:
+                    try:
+                        self.tool = self.factory()
+                    except Exception as e:
+                        print(f"⚠️ {self.name} tool unavailable")
+                        # Surfaces to the agent as an observation, not a failed search
+                        raise ToolException(f"{self.name} is unavailable: {e}")
+        return self.tool
+    
+    def _fetch(self, query: str) -> str:
+        """Call the wrapped tool, rate-limited when a scheduler is attached"""
+        tool = self._get_tool()
+        if self.scheduler is None:
+            return _run_with_deadline(tool.run, query)
+        # Raise errors so 429s can be retried instead of becoming observations
+        return self.scheduler.call(
+            self.backend, lambda: _run_with_deadline(tool._run, query)
+        )
+    
+    async def _arun(self, query: str, run_manager: Optional[Any] = None) -> str:
+        """Async variant of _run using the wrapped tool's async path"""
+        key = self._normalize_input(query)
+        cached = self._cached(key)
+        if cached is not None:
+            return self._pack(cached["observation"])
+        
+        limiter = self._limiter()
+        if limiter is not None:
+            # Threading semaphore shared with sync callers; wait for it off the loop
+            await asyncio.to_thread(limiter.acquire)
+        try:
+            tool = self._get_tool()
+            if self.scheduler is None:
+                observation = await _await_with_deadline(tool.arun(query))
+            else:
+                observation = await self.scheduler.acall(
+                    self.backend, lambda: _await_with_deadline(tool._arun(query))
+                )
+        finally:
+            if limiter is not None:
+                limiter.release()
+        self._store(key, observation)
+        return self._pack(observation)
@@ -4,23 +4,33 @@ Features: Streaming, Caching, Multiple Modes, Multi-language
 """
 
 import os
+import re
+import math
+import asyncio
 import json
+import zlib
+import random
+import statistics
+import time
+import heapq
+import sqlite3
 import hashlib
-from typing import Optional, List, Dict, Any, Iterator
-from datetime import datetime, timedelta
-from langchain_groq import ChatGroq
-from langchain_community.tools import (
-    DuckDuckGoSearchRun,
-    WikipediaQueryRun,
-    ArxivQueryRun
-)
-from langchain_community.utilities import (
-    WikipediaAPIWrapper,
-    ArxivAPIWrapper
-)
-from langchain.prompts import PromptTemplate
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.callbacks.base import BaseCallbackHandler
+import threading
+import itertools
+import queue
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, AsyncIterator, Iterator, Tuple
+from datetime import timedelta
+
+# LangChain, Groq and the search libraries are imported on first use (see
+# agent_components and the tool factories) to keep cold starts fast
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+    from langchain.agents import AgentExecutor
+    from agent_components import SearchEventHandler, SearchTraceHandler
 
 # LangSmith Configuration (Optional)
 LANGSMITH_ENABLED = os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "true"
@@ -29,62 +39,1469 @@ if LANGSMITH_ENABLED:
     os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "nexa-search")
 
 
-class StreamingCallbackHandler(BaseCallbackHandler):
-    """Callback handler for streaming responses"""
+# Names re-exported from agent_components, loaded lazily on first access
+_LAZY_COMPONENTS = (
+    "SearchTraceHandler",
+    "SearchEventHandler",
+    "ScheduledChatGroq",
+    "CachedTool",
+)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_COMPONENTS:
+        import agent_components
+        return getattr(agent_components, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Scheduling priority for the current search; lower runs first
+_request_priority = contextvars.ContextVar("nexa_request_priority", default=1)
+
+# time.monotonic() deadline for the current search stage, if any
+_request_deadline = contextvars.ContextVar("nexa_request_deadline", default=None)
+
+# Per-tool semaphores capping concurrent network calls for the current batch
+_source_limiters = contextvars.ContextVar("nexa_source_limiters", default=None)
+
+# ObservationPacker for the current search, if context packing is enabled
+_observation_packer = contextvars.ContextVar("nexa_observation_packer", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a search stage runs past its latency budget"""
+
+
+def _remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline (None when unbounded)"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _check_deadline() -> Optional[float]:
+    """Raise DeadlineExceeded if the deadline passed; else return time left"""
+    remaining = _remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Latency budget exhausted")
+    return remaining
+
+
+def _run_with_deadline(fn: callable, *args) -> Any:
+    """
+    Run fn(*args), giving up (not killing it) once the deadline passes
+    
+    Each call gets its own daemon thread rather than a slot in a shared
+    pool: an abandoned call (a hung DuckDuckGo request, say) then only
+    holds its own thread until the client returns, instead of capping
+    every later tool call in the process behind it.
+    """
+    remaining = _check_deadline()
+    if remaining is None:
+        return fn(*args)
+    future = Future()
+    context = contextvars.copy_context()
+    
+    def run():
+        try:
+            future.set_result(context.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name="nexa-deadline", daemon=True).start()
+    try:
+        return future.result(timeout=remaining)
+    except FutureTimeoutError:
+        raise DeadlineExceeded("Latency budget exhausted")
+
+
+async def _await_with_deadline(awaitable) -> Any:
+    """Await with the current deadline as timeout"""
+    remaining = _check_deadline()
+    if remaining is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Latency budget exhausted")
+
+
+class RateLimitBucket:
+    """
+    Multi-dimension token bucket with priority-ordered waiters
+
+    Each dimension (e.g. requests and tokens per minute) refills
+    continuously. Waiters are served strictly by (priority, arrival), so a
+    quick-mode request never queues behind a deep-mode one.
+    """
+    
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        # dimension -> (capacity, refill period in seconds)
+        self.limits = limits
+        self.levels = {dim: float(capacity) for dim, (capacity, _) in limits.items()}
+        self._updated = time.monotonic()
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        for dim, (capacity, period) in self.limits.items():
+            self.levels[dim] = min(capacity, self.levels[dim] + elapsed * capacity / period)
+    
+    def _clamp(self, cost: Dict[str, float]) -> Dict[str, float]:
+        # A single request larger than the bucket would otherwise wait forever
+        return {
+            dim: min(amount, self.limits[dim][0])
+            for dim, amount in cost.items() if dim in self.limits
+        }
+    
+    def _try_take(self, ticket: Tuple[int, int], cost: Dict[str, float]) -> float:
+        """Consume if ticket is first in line and tokens suffice; else return seconds to wait"""
+        self._refill(time.monotonic())
+        if self._waiters[0] != ticket:
+            return 0.05
+        deficit = 0.0
+        for dim, amount in cost.items():
+            capacity, period = self.limits[dim]
+            missing = amount - self.levels[dim]
+            if missing > 0:
+                deficit = max(deficit, missing * period / capacity)
+        if deficit > 0:
+            return deficit
+        for dim, amount in cost.items():
+            self.levels[dim] -= amount
+        heapq.heappop(self._waiters)
+        self._cond.notify_all()
+        return 0.0
+    
+    def _record(self, waited: float):
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+    
+    def _abandon(self, ticket: Tuple[int, int]):
+        """Remove a waiter that gave up (caller holds the lock)"""
+        if ticket in self._waiters:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+            self._cond.notify_all()
+    
+    def acquire(self, cost: Dict[str, float], priority: int = 1, timeout: Optional[float] = None):
+        """Block until the cost can be paid, in priority order"""
+        cost = self._clamp(cost)
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                delay = self._try_take(ticket, cost)
+                if delay <= 0:
+                    break
+                if timeout is not None:
+                    left = started + timeout - time.monotonic()
+                    if left <= 0:
+                        self._abandon(ticket)
+                        raise DeadlineExceeded("Latency budget exhausted waiting for rate limit")
+                    delay = min(delay, left)
+                self._cond.wait(timeout=delay)
+            self._record(time.monotonic() - started)
+    
+    async def aacquire(self, cost: Dict[str, float], priority: int = 1, timeout: Optional[float] = None):
+        """Async variant of acquire() that never blocks the event loop"""
+        cost = self._clamp(cost)
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(ticket, cost)
+                    if delay <= 0:
+                        self._record(time.monotonic() - started)
+                        return
+                if timeout is not None:
+                    left = started + timeout - time.monotonic()
+                    if left <= 0:
+                        raise DeadlineExceeded("Latency budget exhausted waiting for rate limit")
+                    delay = min(delay, left)
+                await asyncio.sleep(min(delay, 0.25))
+        except BaseException:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "queue_depth": len(self._waiters),
+                "acquired": self.acquired,
+                "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+                "available": dict(self.levels),
+            }
+
+
+class RequestScheduler:
+    """
+    Rate-limit-aware gate in front of Groq and the search backends
+
+    Every outbound call waits for its backend's token bucket, and calls
+    rejected with HTTP 429 are retried with jittered exponential backoff
+    (or after the server's Retry-After) instead of failing the search.
+    """
+    
+    # Free-tier defaults; override with NEXA_GROQ_RPM, NEXA_GROQ_TPM, NEXA_DDG_RPM
+    DEFAULT_LIMITS = {
+        "groq": {
+            "requests": (float(os.getenv("NEXA_GROQ_RPM", "30")), 60.0),
+            "tokens": (float(os.getenv("NEXA_GROQ_TPM", "6000")), 60.0),
+        },
+        "duckduckgo": {"requests": (float(os.getenv("NEXA_DDG_RPM", "20")), 60.0)},
+        "wikipedia": {"requests": (200.0, 60.0)},
+        "arxiv": {"requests": (20.0, 60.0)},
+    }
+    
+    # Scheduling priority by search mode (lower is served first)
+    MODE_PRIORITY = {"quick": 0, "parallel": 1, "balanced": 1, "deep": 2}
+    
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Tuple[float, float]]]] = None,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        self.buckets = {
+            backend: RateLimitBucket(backend_limits)
+            for backend, backend_limits in (limits or self.DEFAULT_LIMITS).items()
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = Counter()
+        self.rate_limited = Counter()
+    
+    @staticmethod
+    def is_rate_limited(error: Exception) -> bool:
+        """Recognize 429s from the Groq SDK, DuckDuckGo and HTTP clients"""
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status == 429:
+            return True
+        name = type(error).__name__.lower()
+        return "ratelimit" in name or "429" in str(error)
+    
+    def retry_delay(self, backend: str, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is not retryable"""
+        if attempt >= self.max_retries or not self.is_rate_limited(error):
+            return None
+        self.rate_limited[backend] += 1
+        
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+        delay = None
+        try:
+            if retry_after is not None:
+                delay = min(float(retry_after), self.max_delay) + random.uniform(0, self.base_delay)
+        except ValueError:
+            pass
+        if delay is None:
+            # Full jitter keeps retrying workers from stampeding in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        
+        # No point sleeping past the search's latency budget
+        remaining = _remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        self.retries[backend] += 1
+        return delay
+    
+    def acquire(self, backend: str, cost: Optional[Dict[str, float]] = None):
+        bucket = self.buckets.get(backend)
+        if bucket is not None:
+            bucket.acquire(cost or {"requests": 1}, _request_priority.get(), _check_deadline())
     
-    def __init__(self, callback_func):
-        self.callback_func = callback_func
-        self.current_step = ""
+    async def aacquire(self, backend: str, cost: Optional[Dict[str, float]] = None):
+        bucket = self.buckets.get(backend)
+        if bucket is not None:
+            await bucket.aacquire(cost or {"requests": 1}, _request_priority.get(), _check_deadline())
     
-    def on_llm_new_token(self, token: str, **kwargs) -> None:
-        """Called when new token is generated"""
-        if self.callback_func:
-            self.callback_func(token)
+    def call(self, backend: str, fn: callable, cost: Optional[Dict[str, float]] = None):
+        """Run fn() under the backend's rate limit, retrying on 429"""
+        attempt = 0
+        while True:
+            self.acquire(backend, cost)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self.retry_delay(backend, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
     
-    def on_tool_start(self, serialized: dict, input_str: str, **kwargs) -> None:
-        """Called when tool starts"""
-        tool_name = serialized.get("name", "Unknown")
-        self.current_step = f"🔍 Using {tool_name}..."
-        if self.callback_func:
-            self.callback_func(f"\n\n{self.current_step}\n")
+    async def acall(self, backend: str, fn: callable, cost: Optional[Dict[str, float]] = None):
+        """Async variant of call(); fn() must return an awaitable"""
+        attempt = 0
+        while True:
+            await self.aacquire(backend, cost)
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self.retry_delay(backend, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
     
-    def on_tool_end(self, output: str, **kwargs) -> None:
-        """Called when tool completes"""
-        if self.callback_func:
-            self.callback_func(f"✓ Complete\n\n")
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, wait times and retry counts per backend"""
+        return {
+            backend: {
+                **bucket.stats(),
+                "retries": self.retries[backend],
+                "rate_limited": self.rate_limited[backend],
+            }
+            for backend, bucket in self.buckets.items()
+        }
+
+
+def _timed(fn: callable, *args) -> Tuple[Any, float]:
+    """Call fn(*args) and return its result with the elapsed seconds"""
+    started = time.monotonic()
+    result = fn(*args)
+    return result, time.monotonic() - started
 
 
 class SearchCache:
-    """Simple in-memory cache for search results"""
+    """
+    Bounded in-memory cache for search results
+
+    Entries are evicted least-recently-used first once either the entry
+    count or the byte budget is exceeded. Expired entries are swept from an
+    expiry heap on every write (and on read), so stale entries never pile up
+    on long-running workers. With a stale grace window, expired entries are
+    kept that much longer and can still be served by lookup() as stale.
+    """
     
-    def __init__(self, ttl_minutes: int = 30):
-        self.cache = {}
+    def __init__(
+        self,
+        ttl_minutes: int = 30,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024,
+        stale_grace_minutes: float = 0
+    ):
+        self.cache = OrderedDict()  # key -> (result, expires_at, size)
         self.ttl = timedelta(minutes=ttl_minutes)
+        self.stale_grace = timedelta(minutes=stale_grace_minutes)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._expiry_heap = []  # (expires_at, key)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
     
-    def _get_key(self, query: str, mode: str, sources: List[str]) -> str:
+    @staticmethod
+    def _get_key(query: str, mode: str, sources: List[str]) -> str:
         """Generate cache key"""
         key_data = f"{query}_{mode}_{'_'.join(sorted(sources))}"
         return hashlib.md5(key_data.encode()).hexdigest()
     
+    @staticmethod
+    def _estimate_size(result: Dict) -> int:
+        """Approximate memory footprint of a result in bytes"""
+        return len(json.dumps(result, default=str).encode())
+    
+    def _remove(self, key: str):
+        """Drop an entry and release its bytes"""
+        _, _, size = self.cache.pop(key)
+        self._bytes -= size
+    
+    def _sweep_expired(self, now: float):
+        """Pop every entry whose deadline (plus grace) has passed off the expiry heap"""
+        cutoff = now - self.stale_grace.total_seconds()
+        while self._expiry_heap and self._expiry_heap[0][0] <= cutoff:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self.cache.get(key)
+            # Skip heap records superseded by a later set() of the same key
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+    
+    def _evict_to_budget(self):
+        """Evict least-recently-used entries until within limits"""
+        while self.cache and (
+            len(self.cache) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self.evictions += 1
+    
     def get(self, query: str, mode: str, sources: List[str]) -> Optional[Dict]:
         """Get cached result"""
+        result, _ = self.lookup(query, mode, sources, allow_stale=False)
+        return result
+    
+    def lookup(
+        self,
+        query: str,
+        mode: str,
+        sources: List[str],
+        allow_stale: bool = True
+    ) -> Tuple[Optional[Dict], bool]:
+        """Get cached result and whether it is past its TTL (within the grace window)"""
         key = self._get_key(query, mode, sources)
-        if key in self.cache:
-            cached_data, timestamp = self.cache[key]
-            if datetime.now() - timestamp < self.ttl:
-                return cached_data
+        now = time.time()
+        with self._lock:
+            self._sweep_expired(now)
+            entry = self.cache.get(key)
+            stale = entry is not None and entry[1] <= now
+            if entry is None or (stale and not allow_stale):
+                self.misses += 1
+                return None, False
+            self.cache.move_to_end(key)
+            if stale:
+                self.stale_hits += 1
             else:
-                del self.cache[key]
-        return None
+                self.hits += 1
+            return entry[0], stale
     
     def set(self, query: str, mode: str, sources: List[str], result: Dict):
         """Cache result"""
         key = self._get_key(query, mode, sources)
-        self.cache[key] = (result, datetime.now())
+        size = self._estimate_size(result)
+        now = time.time()
+        with self._lock:
+            self._sweep_expired(now)
+            if key in self.cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            expires_at = now + self.ttl.total_seconds()
+            self.cache[key] = (result, expires_at, size)
+            self._bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._evict_to_budget()
+            # Rebuild the heap when superseded records dominate it
+            if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+                self._expiry_heap = [
+                    (expires_at, k) for k, (_, expires_at, _) in self.cache.items()
+                ]
+                heapq.heapify(self._expiry_heap)
     
     def clear(self):
         """Clear cache"""
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+            self._expiry_heap = []
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            self._sweep_expired(time.time())
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self.cache),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class DiskSearchCache:
+    """
+    SQLite-backed search cache shared by every process on a host
+
+    The database runs in WAL mode so readers never block the single writer,
+    which lets several Streamlit workers (and restarts of the same worker)
+    share one set of cached answers. Exposes the same interface as
+    SearchCache.
+    """
+    
+    _get_key = staticmethod(SearchCache._get_key)
+    
+    TOUCH_FLUSH_SECONDS = 5.0  # how often hits write their access times
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_minutes: int = 30,
+        max_entries: int = 10000,
+        stale_grace_minutes: float = 0
+    ):
+        self.path = path or os.getenv("NEXA_CACHE_PATH", ".nexa_cache/search_cache.db")
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.stale_grace = timedelta(minutes=stale_grace_minutes)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touched = {}  # key -> last hit time, not yet written
+        self._last_touch_flush = 0.0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache (expires_at)"
+        )
+        conn.commit()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Delete expired rows and trim to max_entries by last access"""
+        expired = conn.execute(
+            "DELETE FROM search_cache WHERE expires_at <= ?",
+            (now - self.stale_grace.total_seconds(),)
+        ).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            evicted = conn.execute("""
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY accessed_at LIMIT ?
+                )
+            """, (overflow,)).rowcount
+        with self._lock:
+            self.expirations += max(expired, 0)
+            self.evictions += max(evicted, 0)
+    
+    def get(self, query: str, mode: str, sources: List[str]) -> Optional[Dict]:
+        """Get cached result"""
+        result, _ = self.lookup(query, mode, sources, allow_stale=False)
+        return result
+    
+    def lookup(
+        self,
+        query: str,
+        mode: str,
+        sources: List[str],
+        allow_stale: bool = True
+    ) -> Tuple[Optional[Dict], bool]:
+        """Get cached result and whether it is past its TTL (within the grace window)"""
+        key = self._get_key(query, mode, sources)
+        now = time.time()
+        cutoff = now - self.stale_grace.total_seconds() if allow_stale else now
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT result, expires_at FROM search_cache WHERE key = ? AND expires_at > ?",
+            (key, cutoff)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None, False
+        stale = row[1] <= now
+        
+        with self._lock:
+            self._touched[key] = now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            should_flush = now - self._last_touch_flush >= self.TOUCH_FLUSH_SECONDS
+            if should_flush:
+                self._last_touch_flush = now
+        if should_flush:
+            self._flush_touches(conn, wait=False)
+        return json.loads(row[0]), stale
+    
+    def _flush_touches(self, conn: sqlite3.Connection, wait: bool):
+        """
+        Write batched last-access times
+        
+        Reads never take the write lock themselves: hits are recorded in
+        memory and written here, either inside set() (which writes anyway)
+        or every TOUCH_FLUSH_SECONDS from a hit, without waiting if another
+        process holds the lock. LRU order is best-effort either way.
+        """
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        if not wait:
+            conn.execute("PRAGMA busy_timeout=0")
+        try:
+            conn.executemany(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in touched.items()]
+            )
+            if not wait:
+                conn.commit()
+        except sqlite3.OperationalError:
+            conn.rollback()
+            with self._lock:
+                for key, at in touched.items():
+                    self._touched.setdefault(key, at)
+        finally:
+            if not wait:
+                conn.execute("PRAGMA busy_timeout=30000")
+    
+    def set(self, query: str, mode: str, sources: List[str], result: Dict):
+        """Cache result"""
+        key = self._get_key(query, mode, sources)
+        now = time.time()
+        conn = self._connect()
+        self._flush_touches(conn, wait=True)
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, result, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, json.dumps(result, default=str), now + self.ttl.total_seconds(), now)
+        )
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % 50 == 1
+        if should_prune:
+            self._prune(conn, now)
+        conn.commit()
+    
+    def clear(self):
+        """Clear cache"""
+        conn = self._connect()
+        conn.execute("DELETE FROM search_cache")
+        conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return this process's counters and the shared table occupancy"""
+        conn = self._connect()
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(result)), 0) FROM search_cache "
+            "WHERE expires_at > ?",
+            (time.time() - self.stale_grace.total_seconds(),)
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": entries,
+                "bytes": size,
+                "max_entries": self.max_entries,
+                "max_bytes": None,
+            }
+
+
+class SemanticQueryIndex:
+    """
+    Near-duplicate query index for paraphrase-tolerant cache lookups
+
+    Queries are normalized (case, punctuation, filler words) and matched
+    exactly first; otherwise a MinHash/LSH index over word bigrams finds
+    candidates whose Jaccard similarity is verified against the threshold.
+    A candidate must also have exactly the same content words (including
+    numbers and negations such as "not" or "without"), so "install" never
+    answers "uninstall", "windows 10" never answers "windows 11", and
+    "celsius to fahrenheit" never answers the reverse conversion. What is
+    left to tolerate is filler wording and small reorderings. Everything is
+    local and pure Python, and a lookup only touches a handful of LSH
+    buckets regardless of index size.
+    """
+    
+    # Filler words that rarely change what is being asked. Interrogatives
+    # such as "how" and "why" are kept because they do change the question.
+    STOPWORDS = frozenset("""
+        a an the is are was were be been being am do does did of in on at to
+        for from by with about into and or what whats s me my i you your please
+        tell explain describe give show can could would should
+    """.split())
+    
+    MAX_CANDIDATES = 32
+    
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        max_entries: int = 50000
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        # XOR with a random mask is a cheap bijective permutation of the
+        # 32-bit hash space, which keeps signatures well under a millisecond
+        rng = random.Random(1337)
+        self._masks = [rng.getrandbits(32) for _ in range(num_perm)]
+        self._entries = OrderedDict()  # (scope, normalized) -> (query, shingles, band keys, terms)
+        self._buckets = {}  # (scope, band, band hash) -> set of normalized queries
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        """Lowercase, strip punctuation and drop filler words"""
+        tokens = re.findall(r"\w+", query.lower())
+        kept = [t for t in tokens if t not in cls.STOPWORDS]
+        return " ".join(kept or tokens)
+    
+    @staticmethod
+    def _terms(normalized: str) -> frozenset:
+        """Content words; a reused answer has to be about exactly these"""
+        return frozenset(normalized.split())
+    
+    @staticmethod
+    def _shingles(normalized: str) -> frozenset:
+        """Word bigrams with start/end markers, so word order counts"""
+        tokens = ["^"] + normalized.split() + ["$"]
+        return frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    
+    def _band_keys(self, shingles: frozenset) -> List[int]:
+        """MinHash signature folded into one hash per LSH band"""
+        hashes = [zlib.crc32(s.encode()) for s in shingles] or [0]
+        signature = [min([h ^ mask for h in hashes]) for mask in self._masks]
+        return [
+            hash(tuple(signature[i * self.rows:(i + 1) * self.rows]))
+            for i in range(self.bands)
+        ]
+    
+    def _remove(self, entry_key):
+        """Drop an entry and its bucket memberships"""
+        _, _, band_keys, _ = self._entries.pop(entry_key)
+        scope, normalized = entry_key
+        for band, band_key in enumerate(band_keys):
+            bucket = self._buckets.get((scope, band, band_key))
+            if bucket is not None:
+                bucket.discard(normalized)
+                if not bucket:
+                    del self._buckets[(scope, band, band_key)]
+    
+    def add(self, query: str, scope: str):
+        """Index a cached query under a scope (mode and sources)"""
+        normalized = self.normalize(query)
+        shingles = self._shingles(normalized)
+        band_keys = self._band_keys(shingles)
+        entry_key = (scope, normalized)
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            self._entries[entry_key] = (query, shingles, band_keys, self._terms(normalized))
+            for band, band_key in enumerate(band_keys):
+                self._buckets.setdefault((scope, band, band_key), set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def discard(self, query: str, scope: str):
+        """Forget a query whose cache entry no longer exists"""
+        entry_key = (scope, self.normalize(query))
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+    
+    def find(self, query: str, scope: str) -> Optional[str]:
+        """Return the most similar indexed query above the threshold"""
+        normalized = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None:
+                return entry[0]
+        
+        shingles = self._shingles(normalized)
+        band_keys = self._band_keys(shingles)
+        terms = self._terms(normalized)
+        best_query, best_score = None, self.threshold
+        with self._lock:
+            # Verify only the candidates colliding in the most bands, so
+            # crowded buckets cannot blow up lookup time
+            collisions = Counter()
+            for band, band_key in enumerate(band_keys):
+                collisions.update(self._buckets.get((scope, band, band_key), ()))
+            for candidate, _ in collisions.most_common(self.MAX_CANDIDATES):
+                original, candidate_shingles, _, candidate_terms = self._entries[(scope, candidate)]
+                if candidate_terms != terms:
+                    continue
+                union = len(shingles | candidate_shingles)
+                score = len(shingles & candidate_shingles) / union if union else 0.0
+                if score >= best_score:
+                    best_query, best_score = original, score
+        return best_query
+    
+    def clear(self):
+        """Clear the index"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Approximate LLM token count (about 4 characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def _split_passages(text: str, passage_tokens: int) -> List[str]:
+    """Blank-line blocks, with long ones cut into sentence groups of about passage_tokens"""
+    passages = []
+    for block in re.split(r"\n\s*\n", str(text)):
+        block = block.strip()
+        if not block:
+            continue
+        if _estimate_tokens(block) <= passage_tokens:
+            passages.append(block)
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", block):
+            if current and _estimate_tokens(current) + _estimate_tokens(sentence) > passage_tokens:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+
+class ObservationPacker:
+    """
+    Fits tool observations for one search into a token budget
+
+    Each observation is split into passages (blank-line blocks, long ones
+    cut into sentence groups). Passages that mostly repeat text already
+    seen in this search are dropped, the rest are ranked by overlap with
+    the query, and the best are kept, in their original order, up to the
+    observation's share of the remaining budget. Every observation may use
+    half of what is left, so the scratchpad stays bounded however many
+    iterations the agent takes.
+    """
+    
+    PASSAGE_TOKENS = 80  # target size when cutting long blocks
+    MIN_SHARE = 150  # smallest per-observation allowance while budget remains
+    DUPLICATE_OVERLAP = 0.8  # share of a passage's word trigrams already seen
+    
+    def __init__(self, query: str, budget_tokens: int):
+        self.budget = budget_tokens
+        self.used = 0
+        self.query_terms = set(SemanticQueryIndex.normalize(query).split())
+        self._seen_shingles = set()
+        self._lock = threading.Lock()
+        self.observations = 0
+        self.raw_tokens = 0
+        self.duplicates_dropped = 0
+    
+    def pack(self, tool_name: str, observation: str) -> str:
+        """Return the packed observation and charge it against the budget"""
+        with self._lock:
+            self.observations += 1
+            self.raw_tokens += _estimate_tokens(observation)
+            remaining = self.budget - self.used
+            if remaining <= 0:
+                packed = f"[{tool_name}: context budget used up; answer from the observations above]"
+            else:
+                share = min(remaining, max(remaining // 2, self.MIN_SHARE))
+                packed = self._select(observation, share) or (
+                    f"[{tool_name}: nothing new beyond earlier observations]"
+                )
+            self.used += _estimate_tokens(packed)
+            return packed
+    
+    def _select(self, observation: str, share: int) -> str:
+        passages = []
+        candidates = set()  # repeats within this observation count too
+        for passage in self._passages(observation):
+            shingles = self._shingles(passage)
+            seen = sum(1 for s in shingles if s in self._seen_shingles or s in candidates)
+            if shingles and seen >= self.DUPLICATE_OVERLAP * len(shingles):
+                self.duplicates_dropped += 1
+                continue
+            candidates.update(shingles)
+            passages.append((passage, shingles))
+        
+        ranked = sorted(
+            range(len(passages)),
+            key=lambda i: self._relevance(passages[i][0], i),
+            reverse=True
+        )
+        kept = []
+        tokens = 0
+        for i in ranked:
+            cost = _estimate_tokens(passages[i][0])
+            if tokens + cost > share:
+                if not kept:
+                    # The single best passage is too long: keep its head
+                    kept.append(i)
+                    passages[i] = (passages[i][0][:share * 4].rstrip() + "…", passages[i][1])
+                    tokens = share
+                continue
+            kept.append(i)
+            tokens += cost
+        
+        kept.sort()
+        for i in kept:
+            self._seen_shingles.update(passages[i][1])
+        return "\n\n".join(passages[i][0] for i in kept)
+    
+    def _passages(self, observation: str) -> List[str]:
+        return _split_passages(observation, self.PASSAGE_TOKENS)
+    
+    @staticmethod
+    def _shingles(passage: str) -> set:
+        words = re.findall(r"\w+", passage.lower())
+        return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+    
+    def _relevance(self, passage: str, position: int) -> float:
+        words = re.findall(r"\w+", passage.lower())
+        counts = Counter(w for w in words if w in self.query_terms)
+        # Saturating term frequency, so one repeated word cannot dominate
+        score = sum(tf / (tf + 1.0) for tf in counts.values())
+        # Tools list their best matches first; break ties toward earlier passages
+        return score + 0.1 / (1 + position)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "observations": self.observations,
+                "raw_tokens": self.raw_tokens,
+                "packed_tokens": self.used,
+                "saved_tokens": max(self.raw_tokens - self.used, 0),
+                "duplicates_dropped": self.duplicates_dropped,
+                "budget_tokens": self.budget,
+            }
+
+
+class PassageReranker:
+    """
+    Cross-source deduplication and reranking of passages before synthesis
+
+    Observations from every source are split into passages and turned into
+    TF-IDF vectors (sublinear tf, smoothed idf, L2-normalized). Passages
+    are ranked by cosine similarity to the query; walking that ranking,
+    one whose similarity to an already kept passage reaches
+    `duplicate_similarity` is dropped, so a fact restated by Wikipedia and
+    a web snippet reaches the LLM once. The rest are kept, best first, up
+    to `budget_tokens`.
+
+    Uses NumPy/SciPy sparse matrices (block-wise similarity against the
+    passages kept so far); an equivalent pure-Python path covers installs
+    without them.
+    """
+
+    PASSAGE_TOKENS = 80
+    BLOCK_ROWS = 256  # passages compared per sparse matrix product
+
+    def __init__(
+        self,
+        duplicate_similarity: float = 0.8,
+        budget_tokens: Optional[int] = None,
+        vectorized: Optional[bool] = None
+    ):
+        self.duplicate_similarity = duplicate_similarity
+        self.budget_tokens = budget_tokens
+        if vectorized is None:
+            try:
+                import numpy, scipy.sparse  # noqa: F401
+                vectorized = True
+            except ImportError:
+                vectorized = False
+        self.vectorized = vectorized
+        self._stats = {}
+
+    def rerank(self, query: str, observations: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """(source, passage) pairs, most relevant first, without near-duplicates"""
+        passages = [
+            (source, passage)
+            for source, observation in observations
+            for passage in _split_passages(observation, self.PASSAGE_TOKENS)
+        ]
+        if not passages:
+            return []
+
+        from local_index import LocalDocumentIndex
+        documents = [Counter(LocalDocumentIndex._terms(p)) for _, p in passages]
+        query_terms = Counter(LocalDocumentIndex._terms(query))
+        if self.vectorized:
+            order = self._select_vectorized(documents, query_terms)
+        else:
+            order = self._select_python(documents, query_terms)
+
+        kept = []
+        tokens = 0
+        for i in order:
+            cost = _estimate_tokens(passages[i][1])
+            if self.budget_tokens is not None and tokens + cost > self.budget_tokens and kept:
+                break
+            kept.append(passages[i])
+            tokens += cost
+
+        raw_tokens = sum(_estimate_tokens(p) for _, p in passages)
+        self._stats = {
+            "passages": len(passages),
+            "kept": len(kept),
+            "duplicates_dropped": len(passages) - len(order),
+            "raw_tokens": raw_tokens,
+            "kept_tokens": tokens,
+            "saved_tokens": raw_tokens - tokens,
+            "backend": "numpy" if self.vectorized else "python",
+        }
+        return kept
+
+    @staticmethod
+    def _idf(documents: List[Counter]) -> Dict[str, float]:
+        df = Counter(term for counts in documents for term in counts)
+        n = len(documents)
+        return {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+
+    def _select_vectorized(self, documents: List[Counter], query_terms: Counter) -> List[int]:
+        import numpy as np
+        from scipy import sparse
+
+        idf = self._idf(documents)
+        vocabulary = {term: i for i, term in enumerate(idf)}
+        weights = np.fromiter(idf.values(), dtype=np.float64, count=len(idf))
+
+        indptr = [0]
+        indices = []
+        counts = []
+        for document in documents:
+            indices.extend(vocabulary[term] for term in document)
+            counts.extend(document.values())
+            indptr.append(len(indices))
+        tf = 1 + np.log(np.asarray(counts, dtype=np.float64))
+        indices = np.asarray(indices, dtype=np.int64)
+        matrix = sparse.csr_matrix(
+            (tf * weights[indices], indices, indptr), shape=(len(documents), len(vocabulary))
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = sparse.diags(1.0 / norms) @ matrix
+
+        query = np.zeros(len(vocabulary))
+        for term, count in query_terms.items():
+            if term in vocabulary:
+                query[vocabulary[term]] = (1 + math.log(count)) * idf[term]
+        relevance = matrix @ query
+        # Stable sort: ties keep the sources' own ordering
+        ranking = np.argsort(-relevance, kind="stable")
+
+        # Each block is compared with the passages kept so far and with
+        # itself, so the work grows with what is kept, not with n squared
+        ranked = matrix[ranking].tocsr()
+        kept = []  # ranks
+        for start in range(0, len(documents), self.BLOCK_ROWS):
+            block = ranked[start:start + self.BLOCK_ROWS]
+            previous = (
+                (block @ ranked[kept].T).toarray().max(axis=1) if kept
+                else np.zeros(block.shape[0])
+            )
+            within = (block @ block.T).toarray()
+            kept_in_block = []
+            for offset in range(block.shape[0]):
+                if previous[offset] >= self.duplicate_similarity:
+                    continue
+                if kept_in_block and within[offset, kept_in_block].max() >= self.duplicate_similarity:
+                    continue
+                kept_in_block.append(offset)
+            kept.extend(start + offset for offset in kept_in_block)
+        return ranking[kept].tolist()
+
+    def _select_python(self, documents: List[Counter], query_terms: Counter) -> List[int]:
+        idf = self._idf(documents)
+        vectors = []
+        for document in documents:
+            vector = {term: (1 + math.log(count)) * idf[term] for term, count in document.items()}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            vectors.append({term: w / norm for term, w in vector.items()})
+
+        query = {
+            term: (1 + math.log(count)) * idf[term]
+            for term, count in query_terms.items() if term in idf
+        }
+        relevance = [sum(w * query.get(term, 0.0) for term, w in v.items()) for v in vectors]
+        ranking = sorted(range(len(vectors)), key=lambda i: -relevance[i])
+
+        kept = []
+        postings = {}  # term -> [(kept passage, weight)]
+        for i in ranking:
+            similarity = Counter()
+            for term, w in vectors[i].items():
+                for j, other in postings.get(term, ()):
+                    similarity[j] += w * other
+            if similarity and max(similarity.values()) >= self.duplicate_similarity:
+                continue
+            kept.append(i)
+            for term, w in vectors[i].items():
+                postings.setdefault(term, []).append((i, w))
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+def _key_sentences(text: str, query_terms: set, max_tokens: int) -> str:
+    """Most query-relevant sentences of a text, in original order, within max_tokens"""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+    if not sentences:
+        return ""
+    
+    def relevance(i: int) -> float:
+        words = re.findall(r"\w+", sentences[i].lower())
+        return sum(1 for w in set(words) if w in query_terms) + 0.1 / (1 + i)
+    
+    kept = []
+    tokens = 0
+    for i in sorted(range(len(sentences)), key=relevance, reverse=True):
+        cost = _estimate_tokens(sentences[i])
+        if tokens + cost > max_tokens:
+            if not kept:
+                return sentences[i][:max_tokens * 4].rstrip() + "…"
+            continue
+        kept.append(i)
+        tokens += cost
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def _event_text(event: Dict[str, Any]) -> Optional[str]:
+    """Legacy text rendering of a stream event for string stream callbacks"""
+    if event["type"] == "token":
+        return event["text"]
+    if event["type"] == "tool_start":
+        return f"\n\n🔍 Using {event['tool']}...\n"
+    if event["type"] == "tool_end" and not event.get("error"):
+        return "✓ Complete\n\n"
+    return None
+
+
+def _event_stream(
+    stream_callback: Optional[callable],
+    on_event: Optional[callable]
+) -> Optional[callable]:
+    """Combine a text stream callback and a typed event callback into one event sink"""
+    if stream_callback is None and on_event is None:
+        return None
+    
+    def emit(event: Dict[str, Any]):
+        if on_event is not None:
+            on_event(event)
+        if stream_callback is not None:
+            text = _event_text(event)
+            if text:
+                stream_callback(text)
+    
+    return emit
+
+
+# Marks the end of a follower's token queue
+_STREAM_END = object()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution
+
+    The first caller (the leader) runs the function; callers arriving while
+    it is in flight wait on the same future and receive the shared result.
+    Streamed output is fanned out to every subscriber, and late joiners get
+    the tokens emitted so far replayed before live ones. Followers' stream
+    callbacks run on their own thread, as they would without coalescing:
+    the leader only queues tokens for them.
+    """
+    
+    class _Call:
+        def __init__(self):
+            self.future = Future()
+            self.subscribers = []
+            self.emitted = []
+            self.lock = threading.Lock()
+        
+        def subscribe(self, callback: callable):
+            with self.lock:
+                for token in self.emitted:
+                    self._deliver(callback, token)
+                self.subscribers.append(callback)
+        
+        def emit(self, token: str):
+            # Deliver under the lock so replay and live tokens never interleave
+            with self.lock:
+                self.emitted.append(token)
+                for callback in self.subscribers:
+                    self._deliver(callback, token)
+        
+        @staticmethod
+        def _deliver(callback: callable, token: str):
+            try:
+                callback(token)
+            except Exception:
+                # One broken consumer must not fail the shared run
+                pass
+    
+    def __init__(self):
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+    
+    def do(
+        self,
+        key: str,
+        fn: callable,
+        stream_callback: Optional[callable] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn(emit) once per key at a time
+        
+        Returns the result and whether it was shared from another caller's run.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._Call()
+                self._calls[key] = call
+        
+        if not is_leader:
+            if stream_callback is None:
+                return call.future.result(), True
+            tokens = queue.Queue()
+            call.subscribe(tokens.put)
+            # Runs after every emit, since the leader emits before resolving
+            call.future.add_done_callback(lambda _: tokens.put(_STREAM_END))
+            while True:
+                token = tokens.get()
+                if token is _STREAM_END:
+                    break
+                call._deliver(stream_callback, token)
+            return call.future.result(), True
+        
+        if stream_callback:
+            call.subscribe(stream_callback)
+        try:
+            result = fn(call.emit)
+            call.future.set_result(result)
+            return result, False
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+    
+    async def ado(
+        self,
+        key: str,
+        fn: callable,
+        stream_callback: Optional[callable] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Async variant of do(); fn(emit) must return an awaitable
+        
+        The shared work runs in its own task, which every caller (leader
+        included) awaits through asyncio.shield, so cancelling one caller
+        never cancels the run the others are waiting on.
+        """
+        loop = asyncio.get_running_loop()
+        # Tasks are bound to their loop, so coalesce per loop
+        call_key = (id(loop), key)
+        with self._lock:
+            call = self._async_calls.get(call_key)
+            is_leader = call is None
+            if is_leader:
+                call = self._Call()
+                call.future = loop.create_task(self._run_async(call_key, call, fn))
+                # Retrieve the outcome even if every caller was cancelled meanwhile
+                call.future.add_done_callback(lambda task: task.cancelled() or task.exception())
+                self._async_calls[call_key] = call
+        
+        if stream_callback is None:
+            return await asyncio.shield(call.future), not is_leader
+        
+        # Tokens may be emitted from worker threads; deliver them on this loop
+        tokens = asyncio.Queue()
+        call.subscribe(lambda token: loop.call_soon_threadsafe(tokens.put_nowait, token))
+        call.future.add_done_callback(lambda _: tokens.put_nowait(_STREAM_END))
+        while True:
+            token = await tokens.get()
+            if token is _STREAM_END:
+                break
+            call._deliver(stream_callback, token)
+        return call.future.result(), not is_leader
+    
+    async def _run_async(self, call_key: Tuple[int, str], call: "_Call", fn: callable) -> Any:
+        try:
+            return await fn(call.emit)
+        finally:
+            with self._lock:
+                del self._async_calls[call_key]
+    
+    def in_flight(self) -> int:
+        """Number of keys currently executing"""
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
+
+
+class BatchRun:
+    """
+    Streaming batch of searches with bounded concurrency
+
+    Iterating yields {"index", "query", "result", "latency"} dicts in
+    completion order. Only a small window of queries is in flight at a time,
+    so queries may come from a lazy iterable. A query may also be a dict
+    with "query" and per-query "mode", "selected_sources" or "language"
+    overrides. Once iteration finishes, `summary` holds throughput and
+    latency percentiles. `engine` is a NexaSearchEngine or an EnginePool.
+    """
+    
+    def __init__(self, engine: Any, queries, search_kwargs: Dict[str, Any],
+                 max_concurrency: int, max_per_source: Optional[int]):
+        self.engine = engine
+        self.queries = queries
+        self.search_kwargs = search_kwargs
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_source = max_per_source
+        self.summary = None
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Caps live in this batch's context only, so other searches on the
+        # same engine (and other batches) are not throttled by them
+        limiters = None
+        if self.max_per_source:
+            limiters = {
+                name: threading.BoundedSemaphore(self.max_per_source)
+                for name in self.engine.all_tools
+            }
+        
+        latencies = []
+        failures = 0
+        cache_hits = 0
+        started = time.perf_counter()
+        
+        def timed_search(index: int, query: Any) -> Dict[str, Any]:
+            search_kwargs = self.search_kwargs
+            if isinstance(query, dict):
+                search_kwargs = dict(search_kwargs)
+                for key in ("mode", "selected_sources", "language"):
+                    if query.get(key) is not None:
+                        search_kwargs[key] = query[key]
+                query = query["query"]
+            t0 = time.perf_counter()
+            token = _source_limiters.set(limiters)
+            try:
+                result = self.engine.search(query, **search_kwargs)
+            finally:
+                _source_limiters.reset(token)
+            return {
+                "index": index,
+                "query": query,
+                "result": result,
+                "latency": time.perf_counter() - t0
+            }
+        
+        query_iter = enumerate(self.queries)
+        pending = set()
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="nexa-batch"
+        ) as pool:
+            exhausted = False
+            while pending or not exhausted:
+                # Keep a bounded window in flight instead of submitting everything
+                while not exhausted and len(pending) < self.max_concurrency * 2:
+                    try:
+                        index, query = next(query_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(timed_search, index, query))
+                
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = future.result()
+                    latencies.append(item["latency"])
+                    if not item["result"].get("success"):
+                        failures += 1
+                    if item["result"].get("from_cache"):
+                        cache_hits += 1
+                    yield item
+        
+        elapsed = time.perf_counter() - started
+        self.summary = {
+            "queries": len(latencies),
+            "failures": failures,
+            "cache_hits": cache_hits,
+            "elapsed": elapsed,
+            "throughput_qps": len(latencies) / elapsed if elapsed else 0.0,
+            "latency_mean": statistics.mean(latencies) if latencies else 0.0,
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p90": _percentile(latencies, 90),
+            "latency_p99": _percentile(latencies, 99),
+        }
+        print(
+            f"✓ Batch complete: {self.summary['queries']} queries in {elapsed:.1f}s "
+            f"({self.summary['throughput_qps']:.2f} q/s, "
+            f"p50 {self.summary['latency_p50']:.2f}s, p99 {self.summary['latency_p99']:.2f}s)"
+        )
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+def create_cache(
+    backend: Optional[str] = None,
+    ttl_minutes: int = 30,
+    stale_grace_minutes: float = 0
+):
+    """Create the search cache backend ("memory" or "disk")"""
+    backend = (backend or os.getenv("NEXA_CACHE_BACKEND", "memory")).lower()
+    if backend == "disk":
+        return DiskSearchCache(ttl_minutes=ttl_minutes, stale_grace_minutes=stale_grace_minutes)
+    if backend == "memory":
+        return SearchCache(ttl_minutes=ttl_minutes, stale_grace_minutes=stale_grace_minutes)
+    raise ValueError(f"Unknown cache backend: {backend}")
 
 
 class NexaSearchEngine:
@@ -105,159 +1522,610 @@ class NexaSearchEngine:
         'ar': 'Arabic'
     }
     
-    def __init__(self, api_key: Optional[str] = None):
+    # Groq models in order of preference
+    GROQ_MODELS = [
+        "llama-3.3-70b-versatile",
+        "llama-3.1-70b-versatile",
+        "mixtral-8x7b-32768",
+        "llama3-70b-8192",
+    ]
+    
+    # How long a recorded known-good model is trusted without re-probing
+    MODEL_STATUS_TTL_HOURS = 24
+    
+    # Observation cache lifetime per tool: web results go stale quickly,
+    # encyclopedic and academic lookups barely change within a day
+    TOOL_CACHE_TTL_MINUTES = {
+        'web_search': 10,
+        'wikipedia': 24 * 60,
+        'arxiv_search': 24 * 60,
+    }
+    
+    # Rate-limit bucket each tool's network calls are charged to
+    TOOL_BACKENDS = {
+        'web_search': 'duckduckgo',
+        'wikipedia': 'wikipedia',
+        'arxiv_search': 'arxiv',
+    }
+    
+    # Environment variables naming an offline corpus index (built with
+    # build_corpus.py) that replaces a tool's network lookups
+    TOOL_CORPUS_ENV = {
+        'wikipedia': 'NEXA_WIKIPEDIA_CORPUS',
+        'arxiv_search': 'NEXA_ARXIV_CORPUS',
+    }
+    
+    # End-to-end latency budget per mode (seconds). Tool and LLM calls get
+    # the remaining time; when it runs out the answer is synthesized from
+    # the observations gathered so far and marked partial.
+    MODE_LATENCY_BUDGETS = {
+        'quick': 8,
+        'balanced': 25,
+        'deep': 90,
+        'parallel': 25,
+    }
+    
+    # Token budget (approximate) for all tool observations in one search;
+    # 0 passes observations through unpacked
+    MODE_CONTEXT_BUDGETS = {
+        'quick': 1200,
+        'balanced': 2500,
+        'deep': 4000,
+        'parallel': 3000,
+    }
+    
+    # Agent modes: (max_iterations, prompt instruction)
+    AGENT_MODES = {
+        'quick': (3, "Provide a concise, direct answer using minimal tool calls."),
+        'balanced': (10, "Provide a clear, balanced answer with appropriate detail."),
+        'deep': (15, "Provide a comprehensive, detailed answer with thorough research."),
+    }
+    
+    # Compact the scratchpad once a run has more than this many steps
+    # (0 or missing = never); older steps collapse to one line of facts
+    SCRATCHPAD_COMPACT_AFTER = {
+        'deep': 4,
+    }
+    SCRATCHPAD_KEEP_RECENT = 2
+    SCRATCHPAD_FACT_TOKENS = 40
+    
+    # ReAct prompt shared across modes and languages
+    AGENT_PROMPT = """You are Nexa, an intelligent search assistant. {mode_instruction} {language_instruction}
+
+Available tools:
+{tools}
+
+IMPORTANT INSTRUCTIONS:
+- Use tools when you need current/specific information
+- For general knowledge, answer directly without tools
+- After getting tool results, provide the Final Answer immediately
+- Be clear, accurate, and helpful
+
+Format:
+Question: the input question you must answer
+Thought: do I need to use a tool or can I answer directly?
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (repeat only if necessary)
+Thought: I now know the final answer
+Final Answer: provide a clear answer
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+    
+    # Per-tool timeouts (seconds) for mode="parallel"
+    PARALLEL_TOOL_TIMEOUTS = {
+        'local_index': 2,
+        'web_search': 10,
+        'wikipedia': 10,
+        'arxiv_search': 15,
+    }
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache_backend: Optional[str] = None,
+        semantic_threshold: Optional[float] = None,
+        stale_grace_minutes: Optional[float] = None
+    ):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found. Please set it in Streamlit Secrets.")
         
-        self.cache = SearchCache(ttl_minutes=30)
-        self.llm = self._initialize_llm()
-        self.all_tools = self._initialize_all_tools()
-        self.agents = {}  # Cache agents for different configurations
-    
-    def _initialize_llm(self) -> ChatGroq:
-        """Initialize the LLM with the best available free model"""
-        models = [
-            "llama-3.3-70b-versatile",
-            "llama-3.1-70b-versatile",
-            "mixtral-8x7b-32768",
-            "llama3-70b-8192",
-        ]
+        # Stale-while-revalidate window past the TTL (0 disables it)
+        if stale_grace_minutes is None:
+            stale_grace_minutes = float(os.getenv("NEXA_STALE_GRACE_MINUTES", "0"))
+        self.cache = create_cache(
+            cache_backend, ttl_minutes=30, stale_grace_minutes=stale_grace_minutes
+        )
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self.scheduler = RequestScheduler()
+        
+        # Cosine similarity at which synthesis passages count as duplicates (0 disables reranking)
+        self.rerank_similarity = float(os.getenv("NEXA_RERANK_SIMILARITY", "0.8"))
+        
+        # Paraphrase-tolerant second lookup tier (opt-in; 0 disables it)
+        if semantic_threshold is None:
+            semantic_threshold = float(os.getenv("NEXA_SEMANTIC_CACHE_THRESHOLD", "0"))
+        self.semantic_index = (
+            SemanticQueryIndex(threshold=semantic_threshold) if semantic_threshold > 0 else None
+        )
+        self.tool_caches = {
+            name: SearchCache(ttl_minutes=ttl, max_entries=5000)
+            for name, ttl in self.TOOL_CACHE_TTL_MINUTES.items()
+        }
+        # Passages from earlier searches, served by the local_index tool
+        from local_index import create_local_index
+        self.local_index = create_local_index()
+        # The LLM client and tools are built on first use (see properties below)
+        self._llm = None
+        self._all_tools = None
+        self._init_lock = threading.Lock()
+        self.scratchpad_compact_after = dict(self.SCRATCHPAD_COMPACT_AFTER)
+        if os.getenv("NEXA_DEEP_COMPACT_AFTER"):
+            self.scratchpad_compact_after['deep'] = int(os.getenv("NEXA_DEEP_COMPACT_AFTER"))
+        
+        # Executors keyed by mode and tool set; the agents they wrap are shared per tool set
+        self.agents = {}
+        self._agent_runnables = {}
+        self._agent_lock = threading.Lock()
+    
+    @property
+    def llm(self) -> "ChatGroq":
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = self._initialize_llm()
+        return self._llm
+    
+    @llm.setter
+    def llm(self, value: "ChatGroq"):
+        self._llm = value
+    
+    @property
+    def all_tools(self) -> Dict[str, Any]:
+        if self._all_tools is None:
+            with self._init_lock:
+                if self._all_tools is None:
+                    self._all_tools = self._initialize_all_tools()
+        return self._all_tools
+    
+    def _initialize_llm(self) -> "ChatGroq":
+        """
+        Initialize the LLM without a blocking round trip
+        
+        Starts on the last known good model if it was recorded within
+        MODEL_STATUS_TTL_HOURS, otherwise on the first preferred model while
+        a background thread probes the list. Requests that hit an
+        unavailable model fail over to the next one either way.
+        """
+        models = self._model_preferences()
+        status = self._load_model_status()
+        fresh = (
+            status is not None
+            and status.get("model") in models
+            and time.time() - status.get("checked_at", 0) < self.MODEL_STATUS_TTL_HOURS * 3600
+        )
+        
+        model = status["model"] if fresh else models[0]
+        llm = self._create_llm(model, models)
+        print(f"✓ Using model: {model}" + ("" if fresh else " (verifying in background)"))
+        
+        if not fresh:
+            threading.Thread(target=self._probe_models, args=(llm, models), daemon=True).start()
+        return llm
+    
+    def _model_preferences(self) -> List[str]:
+        """Model fallback order, with GROQ_MODEL (if set) tried first"""
+        preferred = os.getenv("GROQ_MODEL")
+        if preferred:
+            return [preferred] + [m for m in self.GROQ_MODELS if m != preferred]
+        return list(self.GROQ_MODELS)
+    
+    def _create_llm(self, model: str, fallback_models: List[str], streaming: bool = True) -> "ChatGroq":
+        from agent_components import ScheduledChatGroq
+        return ScheduledChatGroq(
+            scheduler=self.scheduler,
+            fallback_models=fallback_models,
+            on_model_switch=self._save_model_status,
+            api_key=self.api_key,
+            model=model,
+            temperature=0.3,
+            max_tokens=4096,
+            streaming=streaming,  # Enable streaming
+        )
+    
+    def _probe_models(self, llm: "ChatGroq", models: List[str]):
+        """Find the first available model and switch the shared client to it"""
+        from agent_components import _model_switch_lock
         
         for model in models:
             try:
-                llm = ChatGroq(
-                    api_key=self.api_key,
-                    model=model,
-                    temperature=0.3,
-                    max_tokens=4096,
-                    streaming=True,  # Enable streaming
-                )
-                # Test the model
-                llm.invoke("test")
-                print(f"✓ Using model: {model}")
-                return llm
-            except Exception as e:
+                probe = self._create_llm(model, [model], streaming=False)
+                probe.invoke("test", max_tokens=1)
+            except Exception:
                 print(f"✗ Model {model} unavailable")
                 continue
+            
+            with _model_switch_lock:
+                switched = llm.model_name != model
+                llm.model_name = model
+            if switched:
+                print(f"✓ Switched to model: {model}")
+            self._save_model_status(model)
+            return
         
-        raise RuntimeError("No Groq models available. Check your API key.")
+        print("⚠️ No Groq models responded to the startup probe. Check your API key.")
+    
+    @staticmethod
+    def _model_status_path() -> str:
+        return os.getenv("NEXA_MODEL_STATUS_PATH", ".nexa_cache/model_status.json")
+    
+    def _load_model_status(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._model_status_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_model_status(self, model: str):
+        """Persist the last known good model (atomically, shared by workers)"""
+        path = self._model_status_path()
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"model": model, "checked_at": time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not save model status: {e}")
     
     def _initialize_all_tools(self) -> Dict[str, Any]:
-        """Initialize all available search tools"""
-        tools = {}
+        """
+        Register all search tools
         
-        # Web Search
-        try:
-            tools['web_search'] = DuckDuckGoSearchRun(
-                name="web_search",
-                description="Search the internet for current information, news, and real-time data."
-            )
-        except:
-            print("⚠️ Web search tool unavailable")
+        Each tool is a CachedTool around a factory; the underlying client
+        (and its library import) is only built the first time a lookup
+        misses the observation cache. Tools with an offline corpus
+        configured (TOOL_CORPUS_ENV) serve from it instead of the network,
+        without caching, rate limiting or indexing. When the local index is
+        enabled, network results feed it and `local_index` is registered
+        first so the agent sees it at the top of its tool list.
+        """
+        from agent_components import CachedTool
         
-        # Wikipedia
-        try:
-            tools['wikipedia'] = WikipediaQueryRun(
-                name="wikipedia",
-                description="Search Wikipedia for encyclopedic knowledge and facts.",
-                api_wrapper=WikipediaAPIWrapper(
-                    top_k_results=2,
-                    doc_content_chars_max=1000
-                )
+        tools = {}
+        if self.local_index is not None:
+            tools['local_index'] = CachedTool(
+                name='local_index',
+                description=(
+                    "Search results fetched by earlier searches, stored locally. "
+                    "Instant: try this first, and use the other tools when it has "
+                    "nothing relevant or the topic needs current information."
+                ),
+                factory=self._create_local_index_tool
             )
-        except:
-            print("⚠️ Wikipedia tool unavailable")
         
-        # arXiv
-        try:
-            tools['arxiv_search'] = ArxivQueryRun(
-                name="arxiv_search",
-                description="Search arXiv for academic papers and research articles.",
-                api_wrapper=ArxivAPIWrapper(
-                    top_k_results=2,
-                    doc_content_chars_max=1000
+        tool_specs = {
+            'web_search': (
+                "Search the internet for current information, news, and real-time data.",
+                self._create_web_search_tool
+            ),
+            'wikipedia': (
+                "Search Wikipedia for encyclopedic knowledge and facts.",
+                self._create_wikipedia_tool
+            ),
+            'arxiv_search': (
+                "Search arXiv for academic papers and research articles.",
+                self._create_arxiv_tool
+            ),
+        }
+        
+        for name, (description, factory) in tool_specs.items():
+            corpus_path = os.getenv(self.TOOL_CORPUS_ENV.get(name, ""), "")
+            if corpus_path:
+                tools[name] = CachedTool(
+                    name=name,
+                    description=description,
+                    factory=lambda name=name, description=description, path=corpus_path: (
+                        self._create_corpus_tool(name, description, path)
+                    )
                 )
+                continue
+            tools[name] = CachedTool(
+                name=name,
+                description=description,
+                factory=factory,
+                cache=self.tool_caches[name],
+                index=self.local_index,
+                scheduler=self.scheduler,
+                backend=self.TOOL_BACKENDS.get(name)
             )
-        except:
-            print("⚠️ arXiv tool unavailable")
         
         return tools
     
-    def _get_agent(self, mode: str, selected_sources: List[str], language: str = 'en') -> AgentExecutor:
-        """Get or create agent for specific configuration"""
-        config_key = f"{mode}_{language}_{'_'.join(sorted(selected_sources))}"
-        
-        if config_key in self.agents:
-            return self.agents[config_key]
+    def _create_local_index_tool(self):
+        from langchain_core.tools import Tool
+        return Tool(
+            name="local_index",
+            description="Search results fetched by earlier searches, stored locally.",
+            func=self.local_index.run
+        )
+    
+    @staticmethod
+    def _create_corpus_tool(name: str, description: str, path: str):
+        from corpus_index import create_corpus_tool
+        return create_corpus_tool(
+            name, description, path, top_k=int(os.getenv("NEXA_CORPUS_TOP_K", "3"))
+        )
+    
+    @staticmethod
+    def _create_web_search_tool():
+        from langchain_community.tools import DuckDuckGoSearchRun
+        return DuckDuckGoSearchRun(
+            name="web_search",
+            description="Search the internet for current information, news, and real-time data."
+        )
+    
+    @staticmethod
+    def _create_wikipedia_tool():
+        from langchain_community.tools import WikipediaQueryRun
+        from langchain_community.utilities import WikipediaAPIWrapper
+        return WikipediaQueryRun(
+            name="wikipedia",
+            description="Search Wikipedia for encyclopedic knowledge and facts.",
+            api_wrapper=WikipediaAPIWrapper(
+                top_k_results=2,
+                doc_content_chars_max=1000
+            )
+        )
+    
+    @staticmethod
+    def _create_arxiv_tool():
+        from langchain_community.tools import ArxivQueryRun
+        from langchain_community.utilities import ArxivAPIWrapper
+        return ArxivQueryRun(
+            name="arxiv_search",
+            description="Search arXiv for academic papers and research articles.",
+            api_wrapper=ArxivAPIWrapper(
+                top_k_results=2,
+                doc_content_chars_max=1000
+            )
+        )
+    
+    def _get_agent(self, mode: str, selected_sources: List[str]) -> "AgentExecutor":
+        """
+        Get or create the executor for a mode and tool set
         
-        # Select tools based on sources
-        tools = [self.all_tools[src] for src in selected_sources if src in self.all_tools]
+        The ReAct agent (prompt, tool bindings) is shared by every mode on
+        the same tool set; mode and language instructions are prompt
+        variables supplied per call by _agent_inputs. Executors only differ
+        in their iteration and time limits.
+        """
+        from langchain.agents import AgentExecutor
         
-        if not tools:
-            raise ValueError("No valid tools selected")
+        if mode not in self.AGENT_MODES:
+            mode = "balanced"
+        tool_key = '_'.join(sorted(selected_sources))
+        config_key = f"{mode}_{tool_key}"
         
-        # Configure based on mode
-        if mode == "quick":
-            max_iterations = 3
-            prompt_instruction = "Provide a concise, direct answer using minimal tool calls."
-        elif mode == "deep":
-            max_iterations = 15
-            prompt_instruction = "Provide a comprehensive, detailed answer with thorough research."
-        else:  # balanced (default)
-            max_iterations = 10
-            prompt_instruction = "Provide a clear, balanced answer with appropriate detail."
+        agent_executor = self.agents.get(config_key)
+        if agent_executor is not None:
+            return agent_executor
         
-        # Language instruction
-        lang_name = self.SUPPORTED_LANGUAGES.get(language, 'English')
-        lang_instruction = f"Respond in {lang_name}." if language != 'en' else ""
+        with self._agent_lock:
+            if config_key in self.agents:
+                return self.agents[config_key]
+            
+            # Select tools based on sources, in registration order (local_index first)
+            tools = [tool for name, tool in self.all_tools.items() if name in selected_sources]
+            
+            if not tools:
+                raise ValueError("No valid tools selected")
+            
+            agent = self._agent_runnables.get(tool_key)
+            if agent is None:
+                agent = self._create_agent(tools)
+                self._agent_runnables[tool_key] = agent
+            
+            max_iterations, _ = self.AGENT_MODES[mode]
+            agent_executor = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                verbose=False,
+                handle_parsing_errors=True,
+                max_iterations=max_iterations,
+                max_execution_time=self.MODE_LATENCY_BUDGETS.get(mode, 90),
+                early_stopping_method="generate",
+                return_intermediate_steps=True
+            )
+            
+            self.agents[config_key] = agent_executor
+            return agent_executor
+    
+    def _create_agent(self, tools: List[Any]):
+        """
+        Build the ReAct agent for a tool set
         
-        # Create prompt
-        prompt = PromptTemplate.from_template(f"""You are Nexa, an intelligent search assistant. {prompt_instruction} {lang_instruction}
-
-Available tools:
-{{tools}}
-
-IMPORTANT INSTRUCTIONS:
-- Use tools when you need current/specific information
-- For general knowledge, answer directly without tools
-- After getting tool results, provide the Final Answer immediately
-- Be clear, accurate, and helpful
-
-Format:
-Question: the input question you must answer
-Thought: do I need to use a tool or can I answer directly?
-Action: the action to take, should be one of [{{tool_names}}]
-Action Input: the input to the action
-Observation: the result of the action
-... (repeat only if necessary)
-Thought: I now know the final answer
-Final Answer: provide a clear answer
-
-Question: {{input}}
-Thought:{{agent_scratchpad}}""")
+        Same pipeline as langchain's create_react_agent, except that the
+        scratchpad goes through _format_scratchpad so long runs can be
+        compacted.
+        """
+        from langchain.prompts import PromptTemplate
+        from langchain.agents.output_parsers import ReActSingleInputOutputParser
+        from langchain.tools.render import render_text_description
+        from langchain_core.runnables import RunnablePassthrough
         
-        # Create agent
-        agent = create_react_agent(
-            llm=self.llm,
-            tools=tools,
-            prompt=prompt
+        prompt = PromptTemplate.from_template(self.AGENT_PROMPT).partial(
+            tools=render_text_description(list(tools)),
+            tool_names=", ".join(t.name for t in tools),
         )
+        return (
+            RunnablePassthrough.assign(agent_scratchpad=self._format_scratchpad)
+            | prompt
+            | self.llm.bind(stop=["\nObservation"])
+            | ReActSingleInputOutputParser()
+        )
+    
+    def _format_scratchpad(self, inputs: Dict[str, Any]) -> str:
+        """
+        Render the agent scratchpad, compacting older steps when configured
+        
+        Once a run has more than `compact_after` steps, all but the last
+        SCRATCHPAD_KEEP_RECENT are replaced with one line of key facts each.
+        The executor's intermediate_steps (and the returned trace) keep
+        every step in full.
+        """
+        from langchain.agents.format_scratchpad import format_log_to_str
+        
+        steps = inputs["intermediate_steps"]
+        compact_after = inputs.get("compact_after") or 0
+        if not compact_after or len(steps) <= compact_after:
+            return format_log_to_str(steps)
         
-        # Create executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=tools,
-            verbose=False,
-            handle_parsing_errors=True,
-            max_iterations=max_iterations,
-            max_execution_time=90,
-            early_stopping_method="generate",
-            return_intermediate_steps=True
+        older = steps[:-self.SCRATCHPAD_KEEP_RECENT]
+        recent = steps[-self.SCRATCHPAD_KEEP_RECENT:]
+        query_terms = set(SemanticQueryIndex.normalize(inputs["input"]).split())
+        facts = "\n".join(
+            f"- {action.tool}({action.tool_input}): "
+            f"{_key_sentences(str(observation), query_terms, self.SCRATCHPAD_FACT_TOKENS)}"
+            for action, observation in older
         )
+        summary = (
+            f" Facts gathered in my first {len(older)} steps (details omitted):\n"
+            f"{facts}\nThought: "
+        )
+        return summary + format_log_to_str(recent)
+    
+    def _agent_inputs(self, query: str, mode: str, language: str) -> Dict[str, Any]:
+        """Per-call prompt variables for a shared agent"""
+        _, mode_instruction = self.AGENT_MODES.get(mode, self.AGENT_MODES["balanced"])
+        lang_name = self.SUPPORTED_LANGUAGES.get(language, 'English')
+        return {
+            "input": query,
+            "mode_instruction": mode_instruction,
+            "language_instruction": f"Respond in {lang_name}." if language != 'en' else "",
+            # Read by _format_scratchpad, not the prompt
+            "compact_after": self.scratchpad_compact_after.get(mode, 0),
+        }
+    
+    def prewarm(
+        self,
+        configurations: Optional[List[Tuple[str, List[str]]]] = None,
+        background: bool = True
+    ) -> Optional[threading.Thread]:
+        """
+        Build agents for common configurations ahead of the first query
+        
+        Args:
+            configurations: (mode, sources) pairs; defaults to every agent
+                mode with all sources
+            background: Run in a daemon thread and return it
+        """
+        def warm():
+            started = time.perf_counter()
+            # Resolved here: building the tool registry imports LangChain,
+            # which must stay off the caller's thread
+            targets = configurations
+            if targets is None:
+                targets = [(mode, list(self.all_tools.keys())) for mode in self.AGENT_MODES]
+            for mode, sources in targets:
+                try:
+                    self._get_agent(mode, sources)
+                except Exception as e:
+                    print(f"⚠️ Pre-warming {mode} agent failed: {str(e)}")
+                    return
+            print(f"✓ Pre-warmed {len(targets)} agent configurations "
+                  f"in {time.perf_counter() - started:.2f}s")
+        
+        if not background:
+            warm()
+            return None
+        
+        thread = threading.Thread(target=warm, name="nexa-prewarm", daemon=True)
+        thread.start()
+        return thread
+    
+    @staticmethod
+    def _cache_scope(mode: str, selected_sources: List[str]) -> str:
+        """Semantic index scope matching the cache key's mode and sources"""
+        return f"{mode}_{'_'.join(sorted(selected_sources))}"
+    
+    def _cache_get(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str
+    ) -> Optional[Dict]:
+        """Look up a cached result by exact key, then by near-duplicate query"""
+        cached_query = query
+        cached_result, stale = self.cache.lookup(query, mode, selected_sources)
+        
+        if not cached_result and self.semantic_index is not None:
+            scope = self._cache_scope(mode, selected_sources)
+            similar_query = self.semantic_index.find(query, scope)
+            if similar_query is not None and similar_query != query:
+                cached_result, stale = self.cache.lookup(similar_query, mode, selected_sources)
+                if cached_result:
+                    cached_query = similar_query
+                else:
+                    self.semantic_index.discard(similar_query, scope)
+        
+        if not cached_result:
+            return None
+        
+        cached_result = dict(cached_result)
+        cached_result['from_cache'] = True
+        if cached_query != query:
+            cached_result['cached_query'] = cached_query
+        if stale:
+            cached_result['stale'] = True
+            self._refresh_in_background(cached_query, mode, selected_sources, language)
+        return cached_result
+    
+    def _refresh_in_background(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str
+    ):
+        """Re-run a search whose cached answer went stale and replace the entry"""
+        refresh_key = (query, mode, tuple(sorted(selected_sources)))
+        with self._refresh_lock:
+            if refresh_key in self._refreshing:
+                return
+            self._refreshing.add(refresh_key)
         
-        self.agents[config_key] = agent_executor
-        return agent_executor
+        def refresh():
+            try:
+                result = self._execute_search(query, mode, selected_sources, language)
+                if self._cacheable(result):
+                    self._cache_set(query, mode, selected_sources, result)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(refresh_key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    @staticmethod
+    def _cacheable(result: Dict[str, Any]) -> bool:
+        """Complete answers only; a partial one is left for the next request to redo"""
+        return bool(result.get("success")) and not result.get("partial")
+    
+    def _cache_set(self, query: str, mode: str, selected_sources: List[str], result: Dict):
+        """Cache a result and index its query for near-duplicate lookups"""
+        # Scaffolding is per-run debug output, not part of the answer
+        result = {key: value for key, value in result.items() if key != "scaffolding"}
+        self.cache.set(query, mode, selected_sources, result)
+        if self.semantic_index is not None:
+            self.semantic_index.add(query, self._cache_scope(mode, selected_sources))
     
     def search(
         self, 
@@ -266,91 +2134,715 @@ Thought:{{agent_scratchpad}}""")
         selected_sources: Optional[List[str]] = None,
         language: str = "en",
         use_cache: bool = True,
-        stream_callback: Optional[callable] = None
+        stream_callback: Optional[callable] = None,
+        on_event: Optional[callable] = None
     ) -> Dict[str, Any]:
         """
         Execute search with specified parameters
         
         Args:
             query: Search query
-            mode: "quick", "balanced", or "deep"
+            mode: "quick", "balanced", "deep", or "parallel"
             selected_sources: List of sources to use (default: all)
             language: Language code for response
             use_cache: Whether to use cached results
-            stream_callback: Callback function for streaming
+            stream_callback: Callback function for streaming text
+            on_event: Callback receiving typed stream events (see search_stream)
         """
-        # Default sources
-        if selected_sources is None:
-            selected_sources = list(self.all_tools.keys())
+        selected_sources = self._resolve_sources(selected_sources)
+        if not selected_sources:
+            return self._invalid_sources_result()
+        
+        # Check cache
+        if use_cache:
+            cached_result = self._cache_get(query, mode, selected_sources, language)
+            if cached_result:
+                return cached_result
+        
+        events = _event_stream(stream_callback, on_event)
+        if not use_cache:
+            return self._execute_search(
+                query, mode, selected_sources, language, events
+            )
+        
+        def run_and_cache(emit: callable) -> Dict[str, Any]:
+            search_result = self._execute_search(query, mode, selected_sources, language, emit)
+            # Cache before the in-flight entry is released, so no caller
+            # slips in between and starts a duplicate run
+            if self._cacheable(search_result):
+                self._cache_set(query, mode, selected_sources, search_result)
+            return search_result
+        
+        # Identical concurrent searches share one agent run
+        search_result, shared = self._single_flight.do(
+            self.cache._get_key(query, mode, selected_sources),
+            run_and_cache,
+            events
+        )
+        if shared:
+            search_result = dict(search_result)
+            search_result['coalesced'] = True
+        return search_result
+    
+    async def asearch(
+        self,
+        query: str,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        use_cache: bool = True,
+        stream_callback: Optional[callable] = None,
+        on_event: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of search() built on the executor's ainvoke path
         
-        # Validate sources
-        selected_sources = [s for s in selected_sources if s in self.all_tools]
+        Caching, coalescing and source extraction behave exactly as in
+        search(), so one event loop can serve many concurrent searches.
+        """
+        selected_sources = self._resolve_sources(selected_sources)
         if not selected_sources:
-            return {
-                "answer": "Error: No valid search sources selected.",
-                "sources": [],
-                "success": False,
-                "error": "Invalid sources"
-            }
+            return self._invalid_sources_result()
         
         # Check cache
         if use_cache:
-            cached_result = self.cache.get(query, mode, selected_sources)
+            cached_result = self._cache_get(query, mode, selected_sources, language)
             if cached_result:
-                cached_result['from_cache'] = True
                 return cached_result
         
+        events = _event_stream(stream_callback, on_event)
+        if not use_cache:
+            return await self._aexecute_search(
+                query, mode, selected_sources, language, events
+            )
+        
+        async def run_and_cache(emit: callable) -> Dict[str, Any]:
+            search_result = await self._aexecute_search(
+                query, mode, selected_sources, language, emit
+            )
+            if self._cacheable(search_result):
+                self._cache_set(query, mode, selected_sources, search_result)
+            return search_result
+        
+        search_result, shared = await self._single_flight.ado(
+            self.cache._get_key(query, mode, selected_sources),
+            run_and_cache,
+            events
+        )
+        if shared:
+            search_result = dict(search_result)
+            search_result['coalesced'] = True
+        return search_result
+    
+    def search_stream(
+        self,
+        query: str,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        use_cache: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run a search and yield typed events as it progresses
+        
+        Yields "token", "tool_start" and "tool_end" events (see
+        SearchEventHandler), then exactly one "final" event carrying the
+        result dict, or an "error" event if the search failed. A cached
+        answer yields only the final event. Closing the generator early
+        does not cancel the search; it finishes (and is cached) in the
+        background.
+        """
+        events = queue.Queue()
+        outcome = {}
+        
+        def run():
+            try:
+                outcome["result"] = self.search(
+                    query, mode, selected_sources, language, use_cache, on_event=events.put
+                )
+            except Exception as e:
+                outcome["result"] = self._error_result(e)
+            events.put(None)
+        
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name="nexa-stream", daemon=True).start()
+        
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+        yield self._final_event(outcome["result"])
+    
+    async def asearch_stream(
+        self,
+        query: str,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        use_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator variant of search_stream() built on asearch()"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        
+        def on_event(event: Dict[str, Any]):
+            # Tool and LLM callbacks may fire on executor threads
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        
+        task = asyncio.ensure_future(
+            self.asearch(query, mode, selected_sources, language, use_cache, on_event=on_event)
+        )
+        while not task.done():
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        
+        # Let thread-side puts scheduled before completion land, then drain them
+        await asyncio.sleep(0)
+        while not events.empty():
+            yield events.get_nowait()
+        
+        try:
+            result = task.result()
+        except Exception as e:
+            result = self._error_result(e)
+        yield self._final_event(result)
+    
+    @staticmethod
+    def _final_event(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Closing event of a search stream"""
+        if result.get("success"):
+            return {"type": "final", "result": result}
+        return {
+            "type": "error",
+            "error": result.get("error") or result.get("answer", "Search failed"),
+            "result": result,
+        }
+    
+    def search_batch(
+        self,
+        queries,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        max_concurrency: int = 4,
+        max_per_source: Optional[int] = None
+    ) -> BatchRun:
+        """
+        Run many searches with bounded concurrency, filling the cache
+        
+        Args:
+            queries: Iterable of query strings or per-query dicts (may be lazy)
+            max_concurrency: Maximum searches in flight at once
+            max_per_source: Maximum concurrent network calls per search tool
+        """
+        search_kwargs = {
+            "mode": mode,
+            "selected_sources": selected_sources,
+            "language": language,
+            "use_cache": True,
+        }
+        return BatchRun(self, queries, search_kwargs, max_concurrency, max_per_source)
+    
+    def _resolve_sources(self, selected_sources: Optional[List[str]]) -> List[str]:
+        """Default to all tools and drop unknown sources"""
+        if selected_sources is None:
+            selected_sources = list(self.all_tools.keys())
+        return [s for s in selected_sources if s in self.all_tools]
+    
+    @staticmethod
+    def _invalid_sources_result() -> Dict[str, Any]:
+        return {
+            "answer": "Error: No valid search sources selected.",
+            "sources": [],
+            "success": False,
+            "error": "Invalid sources"
+        }
+    
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, Any]:
+        return {
+            "answer": f"Search error: {str(error)}",
+            "sources": [],
+            "success": False,
+            "error": str(error)
+        }
+    
+    @staticmethod
+    def _build_result(result: Dict[str, Any], mode: str, language: str) -> Dict[str, Any]:
+        """Turn executor output into the search result dict"""
+        # Extract sources
+        sources = []
+        if "intermediate_steps" in result:
+            for step in result["intermediate_steps"]:
+                if len(step) >= 2:
+                    action = step[0]
+                    tool_name = getattr(action, 'tool', 'Unknown')
+                    tool_input = str(getattr(action, 'tool_input', ''))
+                    
+                    sources.append({
+                        "tool": tool_name,
+                        "query": tool_input
+                    })
+        
+        return {
+            "answer": result.get("output", "No answer generated."),
+            "sources": sources,
+            "success": True,
+            "mode": mode,
+            "language": language,
+            "from_cache": False
+        }
+    
+    def _latency_budget(self, mode: str) -> Tuple[float, float]:
+        """Total budget for a mode and the share reserved for final synthesis"""
+        budget = self.MODE_LATENCY_BUDGETS.get(mode, self.MODE_LATENCY_BUDGETS["balanced"])
+        reserve = min(max(budget * 0.2, 2.0), 10.0)
+        return budget, reserve
+    
+    def _execute_search(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Run one search with observation packing (no cache involved)"""
+        packer = self._observation_packer(query, mode)
+        packer_token = _observation_packer.set(packer)
+        priority_token = _request_priority.set(RequestScheduler.MODE_PRIORITY.get(mode, 1))
+        try:
+            search_result = self._execute_agent_search(
+                query, mode, selected_sources, language, event_callback
+            )
+        finally:
+            _request_priority.reset(priority_token)
+            _observation_packer.reset(packer_token)
+        return self._with_context_stats(search_result, packer)
+    
+    async def _aexecute_search(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Async variant of _execute_search()"""
+        packer = self._observation_packer(query, mode)
+        packer_token = _observation_packer.set(packer)
+        priority_token = _request_priority.set(RequestScheduler.MODE_PRIORITY.get(mode, 1))
+        try:
+            search_result = await self._aexecute_agent_search(
+                query, mode, selected_sources, language, event_callback
+            )
+        finally:
+            _request_priority.reset(priority_token)
+            _observation_packer.reset(packer_token)
+        return self._with_context_stats(search_result, packer)
+    
+    def _observation_packer(self, query: str, mode: str) -> Optional[ObservationPacker]:
+        budget = self.MODE_CONTEXT_BUDGETS.get(mode, 0)
+        return ObservationPacker(query, budget) if budget > 0 else None
+    
+    @staticmethod
+    def _with_context_stats(search_result: Dict[str, Any], packer: Optional[ObservationPacker]) -> Dict[str, Any]:
+        """Report how many observation tokens packing saved"""
+        if packer is not None and search_result.get("success"):
+            search_result["context"] = packer.stats()
+        return search_result
+    
+    def _execute_agent_search(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Run the agent and build the result dict"""
+        from agent_components import SearchEventHandler, SearchTraceHandler
+        
+        if mode == "parallel":
+            return self._execute_parallel(query, selected_sources, language, event_callback)
+        
+        budget, reserve = self._latency_budget(mode)
+        trace = SearchTraceHandler()
+        agent_deadline = trace.started + budget - reserve
+        deadline_token = _request_deadline.set(agent_deadline)
         try:
             # Get agent
-            agent = self._get_agent(mode, selected_sources, language)
+            agent = self._get_agent(mode, selected_sources)
             
             # Setup streaming if callback provided
-            callbacks = []
-            if stream_callback:
-                callbacks.append(StreamingCallbackHandler(stream_callback))
+            events = SearchEventHandler(event_callback) if event_callback else None
+            callbacks = [trace] + ([events] if events else [])
             
             # Execute search
-            result = agent.invoke(
-                {"input": query},
-                config={"callbacks": callbacks} if callbacks else None
+            try:
+                result = agent.invoke(
+                    self._agent_inputs(query, mode, language), config={"callbacks": callbacks}
+                )
+            except Exception as e:
+                if not (isinstance(e, DeadlineExceeded) or time.monotonic() >= agent_deadline):
+                    raise
+                # Out of budget: answer from whatever observations arrived
+                _request_deadline.set(trace.started + budget)
+                with trace.stage("synthesis"):
+                    message = self.llm.invoke(
+                        self._synthesis_prompt(query, trace.observations(), language, trace, mode),
+                        config=(
+                            {"callbacks": [SearchEventHandler(event_callback, answer_only=False)]}
+                            if event_callback else None
+                        )
+                    )
+                return self._with_scaffolding(
+                    self._build_partial_result(message, trace, mode, language), events
+                )
+            
+            search_result = self._build_result(result, mode, language)
+            search_result["partial"] = False
+            search_result["timings"] = trace.timings()
+            return self._with_scaffolding(search_result, events)
+            
+        except Exception as e:
+            return self._error_result(e)
+        finally:
+            _request_deadline.reset(deadline_token)
+    
+    async def _aexecute_agent_search(
+        self,
+        query: str,
+        mode: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Async variant of _execute_agent_search()"""
+        from agent_components import SearchEventHandler, SearchTraceHandler
+        
+        if mode == "parallel":
+            return await self._aexecute_parallel(query, selected_sources, language, event_callback)
+        
+        budget, reserve = self._latency_budget(mode)
+        trace = SearchTraceHandler()
+        agent_deadline = trace.started + budget - reserve
+        deadline_token = _request_deadline.set(agent_deadline)
+        try:
+            agent = self._get_agent(mode, selected_sources)
+            
+            events = SearchEventHandler(event_callback) if event_callback else None
+            callbacks = [trace] + ([events] if events else [])
+            
+            try:
+                result = await _await_with_deadline(
+                    agent.ainvoke(
+                        self._agent_inputs(query, mode, language), config={"callbacks": callbacks}
+                    )
+                )
+            except Exception as e:
+                if not (isinstance(e, DeadlineExceeded) or time.monotonic() >= agent_deadline):
+                    raise
+                _request_deadline.set(trace.started + budget)
+                with trace.stage("synthesis"):
+                    message = await _await_with_deadline(self.llm.ainvoke(
+                        self._synthesis_prompt(query, trace.observations(), language, trace, mode),
+                        config=(
+                            {"callbacks": [SearchEventHandler(event_callback, answer_only=False)]}
+                            if event_callback else None
+                        )
+                    ))
+                return self._with_scaffolding(
+                    self._build_partial_result(message, trace, mode, language), events
+                )
+            
+            search_result = self._build_result(result, mode, language)
+            search_result["partial"] = False
+            search_result["timings"] = trace.timings()
+            return self._with_scaffolding(search_result, events)
+            
+        except Exception as e:
+            return self._error_result(e)
+        finally:
+            _request_deadline.reset(deadline_token)
+    
+    @staticmethod
+    def _with_scaffolding(
+        search_result: Dict[str, Any],
+        events: Optional["SearchEventHandler"]
+    ) -> Dict[str, Any]:
+        """Attach the ReAct scaffolding filtered out of a streamed answer"""
+        if events is not None and events.scaffolding:
+            search_result["scaffolding"] = "".join(events.scaffolding)
+        return search_result
+    
+    @staticmethod
+    def _build_partial_result(
+        message: Any,
+        trace: "SearchTraceHandler",
+        mode: str,
+        language: str
+    ) -> Dict[str, Any]:
+        """Result dict for an answer synthesized after the budget ran out"""
+        return {
+            "answer": getattr(message, "content", str(message)) or "No answer generated.",
+            "sources": [
+                {"tool": tool_name, "query": tool_input}
+                for tool_name, tool_input, _ in trace.steps
+            ],
+            "success": True,
+            "mode": mode,
+            "language": language,
+            "from_cache": False,
+            "partial": True,
+            "timings": trace.timings(),
+            **({"rerank": trace.rerank} if trace.rerank else {}),
+        }
+    
+    def _rerank_observations(
+        self,
+        query: str,
+        observations: List[Tuple[str, str]],
+        mode: str,
+        trace: Optional["SearchTraceHandler"] = None
+    ) -> List[Tuple[str, str]]:
+        """Deduplicate and rerank passages across sources, within the mode's context budget"""
+        if not self.rerank_similarity or not observations:
+            return observations
+        reranker = PassageReranker(
+            duplicate_similarity=self.rerank_similarity,
+            budget_tokens=self.MODE_CONTEXT_BUDGETS.get(mode) or None
+        )
+        ranked = reranker.rerank(query, observations)
+        if trace is not None:
+            trace.rerank = reranker.stats()
+        return ranked
+    
+    def _synthesis_prompt(
+        self,
+        query: str,
+        observations: List[Tuple[str, str]],
+        language: str,
+        trace: Optional["SearchTraceHandler"] = None,
+        mode: str = "parallel"
+    ) -> str:
+        """Build the single-call synthesis prompt for parallel mode and partial answers"""
+        lang_name = self.SUPPORTED_LANGUAGES.get(language, 'English')
+        lang_instruction = f"Respond in {lang_name}." if language != 'en' else ""
+        
+        observations = self._rerank_observations(query, observations, mode, trace)
+        if observations:
+            context = "\n\n".join(
+                f"[{tool_name}]\n{observation}" for tool_name, observation in observations
             )
+        else:
+            context = "(no search results were returned in time)"
+        
+        return f"""You are Nexa, an intelligent search assistant. Provide a clear, balanced answer with appropriate detail. {lang_instruction}
+
+Answer the question using the search results below. Prefer the results over prior knowledge
+when they conflict, and say so if they do not contain the answer.
+
+Search results:
+{context}
+
+Question: {query}
+Answer:"""
+    
+    def _execute_parallel(
+        self,
+        query: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Query every selected source at once, then synthesize with one LLM call"""
+        from agent_components import SearchEventHandler, SearchTraceHandler
+        
+        budget, reserve = self._latency_budget("parallel")
+        trace = SearchTraceHandler()
+        deadline_token = _request_deadline.set(trace.started + budget - reserve)
+        # Synthesis output is all answer, so no Final Answer filtering here
+        events = SearchEventHandler(event_callback, answer_only=False) if event_callback else None
+        # One thread per source for this search alone: with a shared pool,
+        # time spent queued behind other searches counted against each
+        # tool's timeout
+        tool_pool = ThreadPoolExecutor(
+            max_workers=max(len(selected_sources), 1), thread_name_prefix="nexa-tool"
+        )
+        try:
+            futures = {}
+            for source in selected_sources:
+                if events:
+                    events.tool_started(source, query, source)
+                # Copy the context so pool threads keep this search's priority and deadline
+                futures[source] = tool_pool.submit(
+                    contextvars.copy_context().run, _timed, self.all_tools[source].run, query
+                )
             
-            # Extract sources
-            sources = []
-            if "intermediate_steps" in result:
-                for step in result["intermediate_steps"]:
-                    if len(step) >= 2:
-                        action = step[0]
-                        tool_name = getattr(action, 'tool', 'Unknown')
-                        tool_input = str(getattr(action, 'tool_input', ''))
-                        
-                        sources.append({
-                            "tool": tool_name,
-                            "query": tool_input
-                        })
+            observations = []
+            timed_out = []
+            failed = []
+            for source, future in futures.items():
+                deadline = min(
+                    trace.started + self.PARALLEL_TOOL_TIMEOUTS.get(source, 10),
+                    trace.started + budget - reserve
+                )
+                try:
+                    observation, elapsed = future.result(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                    observations.append((source, observation))
+                    trace.record(f"tool:{source}", elapsed)
+                    trace.steps.append((source, query, observation))
+                    if events:
+                        events.tool_finished(source)
+                except (FutureTimeoutError, DeadlineExceeded):
+                    future.cancel()
+                    timed_out.append(source)
+                    if events:
+                        events.tool_finished(source, error="timeout")
+                except Exception as e:
+                    print(f"⚠️ {source} failed: {e}")
+                    failed.append(source)
+                    if events:
+                        events.tool_finished(source, error=str(e))
             
-            search_result = {
-                "answer": result.get("output", "No answer generated."),
-                "sources": sources,
-                "success": True,
-                "mode": mode,
-                "language": language,
-                "from_cache": False
-            }
+            self._require_observations(observations, timed_out, failed)
+            _request_deadline.set(trace.started + budget)
+            callbacks = [events] if events else []
+            with trace.stage("synthesis"):
+                message = self.llm.invoke(
+                    self._synthesis_prompt(query, observations, language, trace),
+                    config={"callbacks": callbacks} if callbacks else None
+                )
             
-            # Cache result
-            if use_cache:
-                self.cache.set(query, mode, selected_sources, search_result)
+            return self._build_parallel_result(message, trace, timed_out, failed, language)
             
-            return search_result
+        except Exception as e:
+            return self._error_result(e)
+        finally:
+            # Timed-out calls finish in the background; don't wait for them
+            tool_pool.shutdown(wait=False)
+            _request_deadline.reset(deadline_token)
+    
+    async def _aexecute_parallel(
+        self,
+        query: str,
+        selected_sources: List[str],
+        language: str,
+        event_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Async variant of _execute_parallel()"""
+        from agent_components import SearchEventHandler, SearchTraceHandler
+        
+        budget, reserve = self._latency_budget("parallel")
+        trace = SearchTraceHandler()
+        deadline_token = _request_deadline.set(trace.started + budget - reserve)
+        # Synthesis output is all answer, so no Final Answer filtering here
+        events = SearchEventHandler(event_callback, answer_only=False) if event_callback else None
+        try:
+            async def fetch(source: str) -> str:
+                if events:
+                    events.tool_started(source, query, source)
+                started = time.monotonic()
+                timeout = min(
+                    self.PARALLEL_TOOL_TIMEOUTS.get(source, 10),
+                    trace.started + budget - reserve - started
+                )
+                observation = await asyncio.wait_for(
+                    self.all_tools[source].arun(query), timeout=max(timeout, 0)
+                )
+                trace.record(f"tool:{source}", time.monotonic() - started)
+                if events:
+                    events.tool_finished(source)
+                return observation
+            
+            outcomes = await asyncio.gather(
+                *[fetch(source) for source in selected_sources],
+                return_exceptions=True
+            )
+            
+            observations = []
+            timed_out = []
+            failed = []
+            for source, outcome in zip(selected_sources, outcomes):
+                if isinstance(outcome, (asyncio.TimeoutError, DeadlineExceeded)):
+                    timed_out.append(source)
+                    if events:
+                        events.tool_finished(source, error="timeout")
+                elif isinstance(outcome, Exception):
+                    print(f"⚠️ {source} failed: {outcome}")
+                    failed.append(source)
+                    if events:
+                        events.tool_finished(source, error=str(outcome))
+                else:
+                    observations.append((source, outcome))
+                    trace.steps.append((source, query, outcome))
+            
+            self._require_observations(observations, timed_out, failed)
+            _request_deadline.set(trace.started + budget)
+            callbacks = [events] if events else []
+            with trace.stage("synthesis"):
+                message = await _await_with_deadline(self.llm.ainvoke(
+                    self._synthesis_prompt(query, observations, language, trace),
+                    config={"callbacks": callbacks} if callbacks else None
+                ))
+            
+            return self._build_parallel_result(message, trace, timed_out, failed, language)
             
         except Exception as e:
-            return {
-                "answer": f"Search error: {str(e)}",
-                "sources": [],
-                "success": False,
-                "error": str(e)
-            }
+            return self._error_result(e)
+        finally:
+            _request_deadline.reset(deadline_token)
+    
+    @staticmethod
+    def _require_observations(
+        observations: List[Tuple[str, str]],
+        timed_out: List[str],
+        failed: List[str]
+    ):
+        """Fail the search rather than synthesize an answer from no results"""
+        if not observations:
+            raise RuntimeError(
+                "No search results: "
+                + ", ".join([f"{s} timed out" for s in timed_out] + [f"{s} failed" for s in failed])
+            )
+    
+    @staticmethod
+    def _build_parallel_result(
+        message: Any,
+        trace: "SearchTraceHandler",
+        timed_out: List[str],
+        failed: List[str],
+        language: str
+    ) -> Dict[str, Any]:
+        """Result dict for parallel mode, with the same sources shape as the agent path"""
+        search_result = {
+            "answer": getattr(message, "content", str(message)) or "No answer generated.",
+            "sources": [
+                {"tool": tool_name, "query": tool_input}
+                for tool_name, tool_input, _ in trace.steps
+            ],
+            "success": True,
+            "mode": "parallel",
+            "language": language,
+            "from_cache": False,
+            "partial": bool(timed_out or failed),
+            "timings": trace.timings(),
+        }
+        if timed_out:
+            search_result["timed_out_sources"] = timed_out
+        if failed:
+            search_result["failed_sources"] = failed
+        if trace.rerank:
+            search_result["rerank"] = trace.rerank
+        return search_result
     
     def get_related_questions(self, query: str) -> List[str]:
         """Generate related questions based on the query"""
@@ -378,8 +2870,28 @@ Thought:{{agent_scratchpad}}""")
         return related[:3]
     
     def clear_cache(self):
-        """Clear the search cache"""
+        """Clear the search cache and tool observation caches"""
         self.cache.clear()
+        if self.semantic_index is not None:
+            self.semantic_index.clear()
+        for tool_cache in self.tool_caches.values():
+            tool_cache.clear()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get search cache statistics"""
+        return self.cache.stats()
+    
+    def get_tool_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get observation cache statistics per tool"""
+        return {name: cache.stats() for name, cache in self.tool_caches.items()}
+    
+    def get_local_index_stats(self) -> Optional[Dict[str, Any]]:
+        """Get local index size and hit counts (None when disabled)"""
+        return self.local_index.stats() if self.local_index is not None else None
+    
+    def get_scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get rate-limit queue depth, wait time and retry counts per backend"""
+        return self.scheduler.stats()
 
 
 # Global instance
@@ -390,8 +2902,28 @@ def get_search_engine() -> NexaSearchEngine:
     global _engine
     if _engine is None:
         _engine = NexaSearchEngine()
+        if os.getenv("NEXA_PREWARM", "1") != "0":
+            _engine.prewarm()
     return _engine
 
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_engine_pool():
+    """Process pool backend when NEXA_WORKERS > 0, else None"""
+    global _pool
+    workers = int(os.getenv("NEXA_WORKERS", "0"))
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            from engine_pool import EnginePool
+            _pool = EnginePool(
+                workers=workers,
+                threads_per_worker=int(os.getenv("NEXA_WORKER_THREADS", "4"))
+            )
+    return _pool
+
 def run_search(
     query: str, 
     mode: str = "balanced",
@@ -401,15 +2933,59 @@ def run_search(
     stream_callback: Optional[callable] = None
 ) -> Dict[str, Any]:
     """Main search function with enhanced parameters"""
+    pool = get_engine_pool()
+    if pool is not None:
+        return pool.search(query, mode, selected_sources, language, use_cache, stream_callback)
     engine = get_search_engine()
     return engine.search(query, mode, selected_sources, language, use_cache, stream_callback)
 
+def run_batch(
+    queries,
+    mode: str = "balanced",
+    selected_sources: Optional[List[str]] = None,
+    language: str = "en",
+    max_concurrency: int = 4,
+    max_per_source: Optional[int] = None
+) -> BatchRun:
+    """Run a batch of searches; iterate the result to stream completions"""
+    engine = get_engine_pool() or get_search_engine()
+    return engine.search_batch(
+        queries, mode, selected_sources, language, max_concurrency, max_per_source
+    )
+
+async def arun_search(
+    query: str,
+    mode: str = "balanced",
+    selected_sources: Optional[List[str]] = None,
+    language: str = "en",
+    use_cache: bool = True,
+    stream_callback: Optional[callable] = None
+) -> Dict[str, Any]:
+    """Async variant of run_search()"""
+    engine = get_search_engine()
+    return await engine.asearch(query, mode, selected_sources, language, use_cache, stream_callback)
+
 def get_related_questions(query: str) -> List[str]:
     """Get related questions"""
+    pool = get_engine_pool()
+    if pool is not None:
+        return pool.get_related_questions(query)
     engine = get_search_engine()
     return engine.get_related_questions(query)
 
 def clear_cache():
     """Clear search cache"""
+    pool = get_engine_pool()
+    if pool is not None:
+        pool.clear_cache()
+        return
     engine = get_search_engine()
     engine.clear_cache()
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get search cache statistics"""
+    pool = get_engine_pool()
+    if pool is not None:
+        return pool.get_cache_stats()
+    engine = get_search_engine()
+    return engine.get_cache_stats()
@@ -8,8 +8,12 @@ from agent_engine import (
     run_search, 
     get_related_questions, 
     clear_cache,
+    get_cache_stats,
+    get_search_engine,
+    get_engine_pool,
     NexaSearchEngine
 )
+from stream_renderer import StreamRenderer
 from datetime import datetime
 import time
 import json
@@ -462,7 +466,7 @@ def init_session_state():
         st.session_state.search_mode = "balanced"
     
     if 'selected_sources' not in st.session_state:
-        st.session_state.selected_sources = ["web_search", "wikipedia", "arxiv_search"]
+        st.session_state.selected_sources = ["local_index", "web_search", "wikipedia", "arxiv_search"]
     
     if 'language' not in st.session_state:
         st.session_state.language = "en"
@@ -553,10 +557,31 @@ def render_answer_card(result: dict, query: str):
     # Display answer
     answer_text = result['answer']
     if result.get('from_cache'):
-        st.info("⚡ Loaded from cache (faster response)")
+        if result.get('cached_query'):
+            cache_note = f"⚡ Loaded from cache (similar to: \"{result['cached_query']}\")"
+        else:
+            cache_note = "⚡ Loaded from cache (faster response)"
+        if result.get('stale'):
+            cache_note += " • ⏳ This answer may be outdated; a fresh one is being fetched in the background"
+        st.info(cache_note)
+    if result.get('partial'):
+        st.warning("⏱️ Time budget reached — this answer is based on the results gathered so far")
     
     st.markdown(answer_text)
     
+    context = result.get('context')
+    if context and context.get('saved_tokens'):
+        st.caption(
+            f"🧮 Source context packed from ~{context['raw_tokens']:,} to "
+            f"~{context['packed_tokens']:,} tokens"
+        )
+    rerank = result.get('rerank')
+    if rerank and rerank.get('saved_tokens'):
+        st.caption(
+            f"🧹 {rerank['duplicates_dropped']} overlapping passages dropped before synthesis "
+            f"(~{rerank['raw_tokens']:,} → ~{rerank['kept_tokens']:,} tokens)"
+        )
+    
     st.markdown("</div></div>", unsafe_allow_html=True)
     
     # Action buttons row
@@ -653,6 +678,7 @@ def render_sources(sources: list):
         
         # Map tool names to friendly names
         tool_names = {
+            'local_index': '🗂️ Local Index',
             'web_search': '🌐 Web Search',
             'wikipedia': '📚 Wikipedia',
             'arxiv_search': '📄 arXiv',
@@ -691,12 +717,13 @@ def render_sidebar():
         st.markdown("### 🎯 Search Mode")
         mode = st.radio(
             "Mode",
-            ["quick", "balanced", "deep"],
-            index=["quick", "balanced", "deep"].index(st.session_state.search_mode),
+            ["quick", "balanced", "deep", "parallel"],
+            index=["quick", "balanced", "deep", "parallel"].index(st.session_state.search_mode),
             format_func=lambda x: {
                 "quick": "⚡ Quick - Fast answers",
                 "balanced": "⚖️ Balanced - Good detail",
-                "deep": "🔬 Deep - Comprehensive"
+                "deep": "🔬 Deep - Comprehensive",
+                "parallel": "🚀 Parallel - All sources at once"
             }[x],
             label_visibility="collapsed"
         )
@@ -707,6 +734,7 @@ def render_sidebar():
         # Source Selection
         st.markdown("### 📚 Search Sources")
         sources = {
+            "local_index": "🗂️ Local Index (earlier results)",
             "web_search": "🌐 Web Search",
             "wikipedia": "📚 Wikipedia",
             "arxiv_search": "📄 arXiv Papers"
@@ -761,6 +789,22 @@ def render_sidebar():
             clear_cache()
             st.success("Cache cleared!")
         
+        try:
+            stats = get_cache_stats()
+        except Exception:
+            stats = None
+        
+        if stats:
+            col1, col2 = st.columns(2)
+            col1.metric("Cache Hits", stats['hits'])
+            col2.metric("Cache Misses", stats['misses'])
+            st.caption(
+                f"Hit rate {stats['hit_rate']:.0%} • "
+                f"{stats['entries']}/{stats['max_entries']} entries • "
+                f"{stats['bytes'] / 1024:.0f} KB • "
+                f"{stats['evictions']} evicted • {stats['expirations']} expired"
+            )
+        
         st.markdown("---")
         
         # Search History
@@ -822,6 +866,14 @@ def main():
     # Render sidebar
     render_sidebar()
     
+    # Create the engine (or start the worker pool) early so agents pre-warm
+    # while the user types; with a pool, searches never touch a local engine
+    try:
+        if get_engine_pool() is None:
+            get_search_engine()
+    except ValueError:
+        pass  # Missing API key is reported when a search runs
+    
     # Header
     st.markdown("""
     <div class="nexa-header">
@@ -848,15 +900,17 @@ def main():
     mode_badges = {
         "quick": "⚡ Quick Mode",
         "balanced": "⚖️ Balanced Mode",
-        "deep": "🔬 Deep Mode"
+        "deep": "🔬 Deep Mode",
+        "parallel": "🚀 Parallel Mode"
     }
     
     active_sources = [
-        s for s in ["web_search", "wikipedia", "arxiv_search"] 
+        s for s in ["local_index", "web_search", "wikipedia", "arxiv_search"] 
         if s in st.session_state.selected_sources
     ]
     
     source_icons = {
+        "local_index": "🗂️",
         "web_search": "🌐",
         "wikipedia": "📚",
         "arxiv_search": "📄"
@@ -886,12 +940,9 @@ def main():
             # Create placeholder for streaming
             if st.session_state.streaming_enabled:
                 stream_placeholder = st.empty()
-                stream_content = ""
                 
-                def stream_callback(token):
-                    nonlocal stream_content
-                    stream_content += token
-                    stream_placeholder.markdown(stream_content)
+                # Coalesce tokens into capped-rate renders instead of one per token
+                stream_callback = StreamRenderer(stream_placeholder, max_fps=15)
                 
                 with st.spinner("🔍 Searching intelligently..."):
                     result = run_search(
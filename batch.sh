@@ -0,0 +1,21 @@
+#!/bin/bash
+
+# Nexa Search - Batch Run Script
+# Runs JSONL queries through the search engine, e.g.:
+#   ./batch.sh queries.jsonl -o results.jsonl --workers 8
+#   ./batch.sh queries.jsonl -o results.jsonl --resume
+
+if [ ! -d "venv" ]; then
+    echo "❌ Error: virtual environment not found. Run ./run.sh once to set it up." >&2
+    exit 1
+fi
+
+source venv/bin/activate
+
+if [ -f ".env" ]; then
+    set -a
+    source .env
+    set +a
+fi
+
+exec python batch_search.py "$@"
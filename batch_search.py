@@ -0,0 +1,214 @@
+"""
+Nexa Search - JSONL batch runner
+
+Reads one query per line from a JSONL file (or stdin) and writes one result
+per line as soon as each search completes. Input lines are either a JSON
+string or an object:
+
+    {"query": "...", "mode": "quick", "sources": ["wikipedia"], "language": "en", "id": "..."}
+
+Only "query" is required. Output lines carry the input line number so a
+run can be resumed:
+
+    {"line": 12, "id": "...", "query": "...", "latency": 1.84, "result": {...}}
+
+Results are written in completion order, so a crash can leave a few lines
+past the last contiguous one finished. --resume scans the output file and
+skips every line already present, except searches that failed (e.g. were
+rate limited): those run again and their new record is appended, so the
+last record for a line wins. --offset skips a fixed number of input lines
+instead.
+
+With NEXA_WORKERS set, searches run on the engine worker pool (see
+engine_pool.py); --max-per-source is not applied there.
+
+Usage:
+    python batch_search.py queries.jsonl -o results.jsonl --workers 8
+    python batch_search.py queries.jsonl -o results.jsonl --resume
+    cat queries.jsonl | python batch_search.py - > results.jsonl
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Any, Dict, Iterator, Set, TextIO, Tuple
+
+from agent_engine import get_engine_pool, get_search_engine
+
+
+def scan_completed(path: str) -> Tuple[int, Set[int], Set[int]]:
+    """
+    Find where a previous run stopped
+
+    Returns the first input line not yet known to be finished, the
+    finished lines beyond it, and the lines whose latest search failed,
+    which are run again. Completion order is close to input order, so
+    these sets stay small even for very large outputs.
+    """
+    offset = 0
+    ahead = set()
+    retry = set()
+    if not os.path.exists(path):
+        return offset, ahead, retry
+
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+                line_no = record["line"]
+            except (ValueError, KeyError, TypeError):
+                continue  # Torn last line from a crash
+            if "result" in record and not record["result"].get("success"):
+                retry.add(line_no)
+            else:
+                retry.discard(line_no)
+            if line_no >= offset:
+                ahead.add(line_no)
+            while offset in ahead:
+                ahead.discard(offset)
+                offset += 1
+    return offset, ahead, retry
+
+
+def read_queries(
+    source: TextIO,
+    out: TextIO,
+    offset: int = 0,
+    skip: Set[int] = frozenset(),
+    retry: Set[int] = frozenset()
+) -> Iterator[Dict[str, Any]]:
+    """Lazily parse input lines into batch items; malformed lines are reported to `out`"""
+    for line_no, raw in enumerate(source):
+        if (line_no < offset or line_no in skip) and line_no not in retry:
+            continue
+        if not raw.strip():
+            continue
+        try:
+            item = json.loads(raw)
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+                raise ValueError("expected a string or an object with 'query'")
+        except ValueError as e:
+            _write(out, {"line": line_no, "error": f"Invalid input: {e}"})
+            continue
+
+        sources = item.get("sources")
+        if isinstance(sources, str):
+            sources = [s.strip() for s in sources.split(",") if s.strip()]
+        yield {
+            "line": line_no,
+            "id": item.get("id"),
+            "query": str(item["query"]).strip(),
+            "mode": item.get("mode"),
+            "selected_sources": sources or None,
+            "language": item.get("language"),
+        }
+
+
+def _write(out: TextIO, record: Dict[str, Any]):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Nexa searches from a JSONL file")
+    parser.add_argument("input", help="JSONL queries file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent searches")
+    parser.add_argument("--max-per-source", type=int, help="Concurrent calls per search tool")
+    parser.add_argument("--mode", default="balanced", help="Default mode for lines without one")
+    parser.add_argument("--language", default="en", help="Default language for lines without one")
+    parser.add_argument("--offset", type=int, default=0, help="Skip this many input lines")
+    parser.add_argument("--resume", action="store_true", help="Skip lines already in --output")
+    parser.add_argument("--offline", action="store_true", help="Scripted LLM and stub tools (no network)")
+    args = parser.parse_args()
+
+    # Status output (ours and the engine's) goes to stderr so stdout stays pure JSONL
+    real_stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        return _run(args, real_stdout)
+    finally:
+        sys.stdout = real_stdout
+
+
+def _run(args: argparse.Namespace, stdout: TextIO) -> int:
+    offset, skip, retry = args.offset, set(), set()
+    if args.resume:
+        if args.output == "-":
+            print("❌ --resume needs an --output file")
+            return 1
+        done_offset, skip, retry = scan_completed(args.output)
+        # Lines skipped by --offset stay skipped even if they failed
+        retry = {line_no for line_no in retry if line_no >= offset}
+        offset = max(offset, done_offset)
+        print(f"✓ Resuming at line {offset} ({len(skip)} later lines already done, "
+              f"{len(retry)} failed lines to retry)")
+
+    pool = None
+    if args.offline:
+        from offline_engine import OfflineSearchEngine
+        engine = OfflineSearchEngine()
+    else:
+        try:
+            # NEXA_WORKERS routes the batch through the engine worker pool
+            pool = get_engine_pool()
+            engine = pool or get_search_engine()
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = stdout if args.output == "-" else open(
+        args.output, "a" if args.resume else "w", encoding="utf-8"
+    )
+    if args.resume and out.tell() > 0:
+        # Terminate a line torn by the crash so the next record starts clean
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")
+
+    # Batch results carry their position in the submitted stream; map it back to input lines
+    in_flight = {}
+
+    def items() -> Iterator[Dict[str, Any]]:
+        for position, item in enumerate(read_queries(source, out, offset, skip, retry)):
+            in_flight[position] = item
+            yield item
+
+    batch = engine.search_batch(
+        items(),
+        mode=args.mode,
+        language=args.language,
+        max_concurrency=args.workers,
+        max_per_source=args.max_per_source
+    )
+
+    try:
+        for completed in batch:
+            item = in_flight.pop(completed["index"])
+            _write(out, {
+                "line": item["line"],
+                "id": item["id"],
+                "query": item["query"],
+                "latency": round(completed["latency"], 3),
+                "result": completed["result"],
+            })
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted; rerun with --resume to continue")
+        return 130
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not stdout:
+            out.close()
+        if pool is not None:
+            pool.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
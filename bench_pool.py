@@ -0,0 +1,78 @@
+"""
+Nexa Search - Engine pool throughput benchmark
+
+Runs the same offline workload (scripted LLM, stub tools, no cache hits)
+through one in-process engine and through EnginePool with 1..N worker
+processes, and reports queries per second for each. With network waits
+removed, the remaining cost is the CPU work the pool spreads over cores.
+
+Usage:
+    python bench_pool.py                  # up to os.cpu_count() workers
+    python bench_pool.py --workers 1 2 4 8 --queries 400
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Workers inherit the environment: give this run its own shared cache file
+os.environ["NEXA_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="nexa-bench-"), "cache.db")
+os.environ["NEXA_PREWARM"] = "0"
+
+from engine_pool import EnginePool
+from offline_engine import OfflineSearchEngine
+
+
+def _throughput(search, queries, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda q: search(q, mode="quick"), queries))
+    elapsed = time.perf_counter() - started
+    failures = sum(1 for r in results if not r.get("success"))
+    if failures:
+        print(f"⚠️ {failures} searches failed")
+    return len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine pool throughput benchmark")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads-per-worker", type=int, default=4)
+    args = parser.parse_args()
+
+    run = 0
+
+    def queries():
+        nonlocal run
+        run += 1
+        return [f"benchmark question {run}-{i}" for i in range(args.queries)]
+
+    print(f"🔍 {args.queries} quick-mode searches, {os.cpu_count()} CPUs")
+
+    engine = OfflineSearchEngine()
+    engine.search("warm up", mode="quick")
+    baseline = _throughput(engine.search, queries(), args.threads_per_worker)
+    print(f"  in-process      {baseline:8.1f} q/s")
+
+    for workers in args.workers:
+        with EnginePool(
+            workers=workers,
+            threads_per_worker=args.threads_per_worker,
+            engine_factory="offline_engine:OfflineSearchEngine"
+        ) as pool:
+            # Wait for every worker to finish starting up before timing
+            for i in range(workers * 4):
+                pool.search(f"warm up {i}", mode="quick")
+            qps = _throughput(pool.search, queries(), workers * args.threads_per_worker)
+        print(f"  {workers:>2} worker(s)    {qps:8.1f} q/s   ({qps / baseline:.2f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
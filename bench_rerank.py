@@ -0,0 +1,105 @@
+"""
+Nexa Search - Passage dedup/rerank benchmark
+
+Builds synthetic multi-source passage sets in which sources restate the
+same facts with small wording changes (as Wikipedia and web snippets do),
+then times PassageReranker's NumPy/SciPy and pure-Python paths and reports
+how many synthesis tokens deduplication saves.
+
+Usage:
+    python bench_rerank.py
+    python bench_rerank.py --sizes 100 1000 10000 --duplicate-share 0.5
+"""
+
+import sys
+import time
+import random
+import argparse
+from typing import List, Tuple
+
+from agent_engine import PassageReranker
+
+
+def make_observations(passages: int, duplicate_share: float, seed: int = 7) -> List[Tuple[str, str]]:
+    """Three sources; about duplicate_share of passages restate an earlier one"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    facts = []
+    by_source = {"web_search": [], "wikipedia": [], "arxiv_search": []}
+    for _ in range(passages):
+        source = rng.choice(list(by_source))
+        if facts and rng.random() < duplicate_share:
+            # Restatement: same fact, a couple of words changed
+            words = list(rng.choice(facts))
+            for _ in range(2):
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        else:
+            words = rng.choices(vocabulary, k=rng.randint(25, 60))
+            facts.append(words)
+        by_source[source].append(" ".join(words) + ".")
+    return [(source, "\n\n".join(texts)) for source, texts in by_source.items() if texts]
+
+
+def _time(reranker: PassageReranker, query: str, observations, repeat: int) -> Tuple[float, list]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        kept = reranker.rerank(query, observations)
+        best = min(best, time.perf_counter() - started)
+    return best, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Passage dedup/rerank benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000])
+    parser.add_argument("--duplicate-share", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-python", type=int, default=5000,
+                        help="Skip the pure-Python path above this many passages")
+    args = parser.parse_args()
+
+    have_numpy = PassageReranker().vectorized
+    if not have_numpy:
+        print("⚠️ NumPy/SciPy not installed; only the pure-Python path is measured")
+
+    print(f"🔍 Passage dedup/rerank ({args.duplicate_share:.0%} restated passages)")
+    print(f"  {'passages':>8} {'numpy ms':>9} {'python ms':>10} {'dropped':>8} {'tokens':>16} {'saved':>6}")
+    for size in args.sizes:
+        observations = make_observations(size, args.duplicate_share)
+        query = observations[0][1].split()[0] + " " + observations[-1][1].split()[1]
+
+        numpy_ms = python_ms = None
+        results = []
+        stats = {}
+        for vectorized in (True, False):
+            reranker = PassageReranker(vectorized=vectorized)
+            if vectorized and not have_numpy:
+                continue
+            if not vectorized and size > args.max_python:
+                continue
+            elapsed, kept = _time(reranker, query, observations, args.repeat)
+            results.append(kept)
+            stats = reranker.stats()
+            if vectorized:
+                numpy_ms = elapsed * 1000
+            else:
+                python_ms = elapsed * 1000
+
+        if len(results) == 2 and results[0] != results[1]:
+            print(f"❌ Backends disagree at {size} passages")
+            return 1
+
+        fmt = lambda ms: f"{ms:9.1f}" if ms is not None else f"{'-':>9}"
+        tokens = f"{stats['raw_tokens']:,} → {stats['kept_tokens']:,}"
+        saved = stats["saved_tokens"] / stats["raw_tokens"] if stats["raw_tokens"] else 0.0
+        print(
+            f"  {stats['passages']:>8} {fmt(numpy_ms)} {fmt(python_ms):>10} "
+            f"{stats['duplicates_dropped']:>8} {tokens:>16} {saved:>6.0%}"
+        )
+
+    print("✓ Done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
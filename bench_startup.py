@@ -0,0 +1,113 @@
+"""
+Nexa Search - Cold start benchmark
+
+Measures, in a fresh interpreter each run:
+  - import time of agent_engine
+  - NexaSearchEngine construction time
+  - time to first result (offline with a scripted LLM and stub tools,
+    or against Groq and the real sources with --live)
+
+Usage:
+    python bench_startup.py                      # offline, 5 runs
+    python bench_startup.py --live               # needs GROQ_API_KEY
+    python bench_startup.py --max-import 0.5 --max-first-result 2.0
+
+Exits with status 1 when a median exceeds its --max-* threshold, so it can
+gate container image builds.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+
+def _measure(live: bool, mode: str, query: str) -> dict:
+    """Single cold-start measurement; runs inside a child interpreter"""
+    started = time.perf_counter()
+    import agent_engine
+    imported = time.perf_counter()
+
+    engine_cls = agent_engine.NexaSearchEngine
+    if not live:
+        from offline_engine import OfflineSearchEngine
+        engine_cls = OfflineSearchEngine
+
+    engine = engine_cls(api_key=os.getenv("GROQ_API_KEY") or "offline", cache_backend="memory")
+    constructed = time.perf_counter()
+
+    result = engine.search(query, mode=mode, use_cache=False)
+    finished = time.perf_counter()
+
+    return {
+        "import": imported - started,
+        "construct": constructed - imported,
+        "first_result": finished - constructed,
+        "total": finished - started,
+        "success": bool(result.get("success")),
+    }
+
+
+def _run_child(args) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--mode", args.mode, "--query", args.query]
+    if args.live:
+        cmd.append("--live")
+    output = subprocess.run(
+        cmd, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    # The engine prints status lines; the measurement is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nexa Search cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="quick")
+    parser.add_argument("--query", default="What is quantum computing?")
+    parser.add_argument("--live", action="store_true", help="Use Groq and real search sources")
+    parser.add_argument("--max-import", type=float, help="Fail if median import time exceeds this (s)")
+    parser.add_argument("--max-first-result", type=float, help="Fail if median time to first result exceeds this (s)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.live, args.mode, args.query)))
+        return 0
+
+    if args.live and not os.getenv("GROQ_API_KEY"):
+        print("❌ GROQ_API_KEY is required for --live")
+        return 1
+
+    samples = [_run_child(args) for _ in range(args.runs)]
+    if not all(s["success"] for s in samples):
+        print("⚠️ Some runs did not return a successful result")
+
+    medians = {
+        key: statistics.median(s[key] for s in samples)
+        for key in ("import", "construct", "first_result", "total")
+    }
+
+    print(f"🔍 Cold start ({'live' if args.live else 'offline'}, {args.runs} runs, mode={args.mode})")
+    for key, value in medians.items():
+        worst = max(s[key] for s in samples)
+        print(f"  {key:<13} median {value * 1000:8.1f} ms   max {worst * 1000:8.1f} ms")
+
+    failed = False
+    if args.max_import is not None and medians["import"] > args.max_import:
+        print(f"❌ Import time {medians['import']:.3f}s exceeds {args.max_import}s")
+        failed = True
+    if args.max_first_result is not None and medians["first_result"] > args.max_first_result:
+        print(f"❌ Time to first result {medians['first_result']:.3f}s exceeds {args.max_first_result}s")
+        failed = True
+
+    if not failed:
+        print("✓ Within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
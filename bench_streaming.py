@@ -0,0 +1,104 @@
+"""
+Nexa Search - Streaming render benchmark
+
+Compares the per-token re-render (markdown() on the full string for every
+token) against StreamRenderer on a simulated token stream. Each render is
+serialized the way a Streamlit delta carries it, so "bytes" approximates
+websocket traffic and "cpu" the render cost on the server side.
+
+Usage:
+    python bench_streaming.py
+    python bench_streaming.py --tokens 4000 --tokens-per-second 400 --fps 20
+"""
+
+import json
+import time
+import random
+import argparse
+
+from stream_renderer import StreamRenderer
+
+
+class SimulatedClock:
+    """Advances only when told to, so runs are deterministic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class MeasuringPlaceholder:
+    """Stands in for st.empty(); serializes each render like a delta message"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    def markdown(self, text: str):
+        payload = json.dumps({"delta": {"markdown": {"body": text}}}).encode("utf-8")
+        self.messages += 1
+        self.bytes += len(payload)
+
+
+def _token_stream(count: int, seed: int = 7):
+    """Answer-like tokens with a tool call every few hundred tokens"""
+    rng = random.Random(seed)
+    words = ["quantum", "computing", "uses", "qubits", "which", "can", "represent",
+             "superposition", "of", "states", "and", "the", "research", "shows", "results"]
+    for i in range(count):
+        if i and i % 400 == 0:
+            yield "\n\n🔍 Using web_search...\n"
+            yield "✓ Complete\n\n"
+        yield (" " if rng.random() < 0.8 else "") + rng.choice(words)
+
+
+def _run(tokens, tokens_per_second, renderer_fps=None):
+    placeholder = MeasuringPlaceholder()
+    clock = SimulatedClock()
+    step = 1.0 / tokens_per_second
+
+    if renderer_fps is None:
+        content = ""
+
+        def callback(token):
+            nonlocal content
+            content += token
+            placeholder.markdown(content)
+    else:
+        callback = StreamRenderer(placeholder, max_fps=renderer_fps, clock=clock)
+
+    started = time.perf_counter()
+    for token in tokens:
+        clock.now += step
+        callback(token)
+    if renderer_fps is not None:
+        callback.close()
+    cpu = time.perf_counter() - started
+
+    return {"messages": placeholder.messages, "bytes": placeholder.bytes, "cpu": cpu}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming render benchmark")
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    args = parser.parse_args()
+
+    tokens = list(_token_stream(args.tokens))
+    naive = _run(tokens, args.tokens_per_second)
+    buffered = _run(tokens, args.tokens_per_second, renderer_fps=args.fps)
+
+    print(f"🔍 {len(tokens)} tokens at {args.tokens_per_second:.0f} tok/s")
+    print(f"  {'':<12}{'renders':>10}{'MB sent':>12}{'cpu ms':>10}")
+    for label, stats in (("per-token", naive), (f"{args.fps:g} Hz", buffered)):
+        print(f"  {label:<12}{stats['messages']:>10}{stats['bytes'] / 1e6:>12.2f}{stats['cpu'] * 1000:>10.1f}")
+    print(f"✓ {naive['messages'] / buffered['messages']:.0f}x fewer renders, "
+          f"{naive['bytes'] / buffered['bytes']:.0f}x less data, "
+          f"{naive['cpu'] / buffered['cpu']:.0f}x less render time")
+
+
+if __name__ == "__main__":
+    main()
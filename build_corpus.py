@@ -0,0 +1,131 @@
+"""
+Nexa Search - Offline corpus builder
+
+Builds a memory-mapped index (see corpus_index.py) for the offline
+`wikipedia` and `arxiv_search` tools from:
+
+  - wikipedia: a Wikipedia abstracts dump, e.g.
+    https://dumps.wikimedia.org/enwiki/latest/enwiki-latest-abstract.xml.gz
+  - arxiv: the arXiv metadata snapshot (arxiv-metadata-oai-snapshot.json,
+    one JSON object per line)
+  - jsonl: any JSONL file of {"title": ..., "text": ...} records, served
+    Wikipedia-style
+
+Inputs may be plain, .gz or .bz2. Records are streamed, so the dump never
+has to fit in memory.
+
+Usage:
+    python build_corpus.py wikipedia enwiki-latest-abstract.xml.gz -o corpora/wikipedia
+    python build_corpus.py arxiv arxiv-metadata-oai-snapshot.json -o corpora/arxiv
+
+Then set NEXA_WIKIPEDIA_CORPUS=corpora/wikipedia and/or
+NEXA_ARXIV_CORPUS=corpora/arxiv.
+"""
+
+import os
+import sys
+import bz2
+import gzip
+import json
+import argparse
+import itertools
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, Iterator
+
+from corpus_index import build_index
+
+
+def _open(path: str, mode: str = "rb"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".bz2"):
+        return bz2.open(path, mode)
+    return open(path, mode)
+
+
+def wikipedia_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Title, abstract and URL of each <doc> in an abstracts dump"""
+    with _open(path) as f:
+        root = None
+        for event, element in ElementTree.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end" or element.tag != "doc":
+                continue
+            title = (element.findtext("title") or "").removeprefix("Wikipedia: ").strip()
+            text = (element.findtext("abstract") or "").strip()
+            url = element.findtext("url") or ""
+            # Drop parsed docs so memory stays flat over the whole dump
+            root.clear()
+            # Disambiguation stubs and section fragments have no usable abstract
+            if title and len(text) > 40:
+                yield {"title": title, "text": text, "url": url}
+
+
+def arxiv_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Papers from the arXiv metadata snapshot"""
+    with _open(path, "rt") as f:
+        for line in f:
+            try:
+                paper = json.loads(line)
+            except ValueError:
+                continue
+            yield {
+                "title": " ".join(paper.get("title", "").split()),
+                "text": " ".join(paper.get("abstract", "").split()),
+                "authors": " ".join(paper.get("authors", "").split()),
+                "published": paper.get("update_date", ""),
+                "url": f"https://arxiv.org/abs/{paper.get('id', '')}",
+            }
+
+
+def jsonl_records(path: str) -> Iterator[Dict[str, Any]]:
+    with _open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("title") or record.get("text"):
+                    yield record
+
+
+READERS = {
+    "wikipedia": (wikipedia_records, "wikipedia"),
+    "arxiv": (arxiv_records, "arxiv"),
+    "jsonl": (jsonl_records, "wikipedia"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline corpus index for Nexa Search")
+    parser.add_argument("format", choices=sorted(READERS))
+    parser.add_argument("input", help="Dump file (plain, .gz or .bz2)")
+    parser.add_argument("-o", "--output", required=True, help="Index directory")
+    parser.add_argument("--limit", type=int, help="Only index the first N documents")
+    parser.add_argument("--block-documents", type=int, default=100000,
+                        help="Documents inverted in memory before spilling to disk")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ {args.input} not found")
+        return 1
+
+    reader, kind = READERS[args.format]
+    records = reader(args.input)
+    if args.limit:
+        records = itertools.islice(records, args.limit)
+
+    try:
+        meta = build_index(records, args.output, kind, block_documents=args.block_documents)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(
+        f"✓ Indexed {meta['documents']:,} documents ({meta['terms']:,} terms) "
+        f"into {args.output} in {meta['build_seconds']}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Nexa Search - Offline corpus indexes
+
+Memory-mapped BM25 indexes over a Wikipedia abstracts dump or an arXiv
+metadata snapshot, served as drop-in `wikipedia` / `arxiv_search` tools.
+Build one with build_corpus.py, then point NEXA_WIKIPEDIA_CORPUS or
+NEXA_ARXIV_CORPUS at the directory.
+
+Index layout (all integers little-endian, native-size arrays):
+
+    meta.json          kind, document count, average length, build time
+    docs.bin           one JSON record per document
+    docs.idx           uint64 byte offsets into docs.bin (count + 1)
+    terms.bin          sorted UTF-8 terms, concatenated
+    terms.idx          uint64 byte offsets into terms.bin (terms + 1)
+    postings.idx       uint64 entry offsets into the postings arrays (terms + 1)
+    postings_docs.bin  uint32 document ids
+    postings_scores.bin float32 BM25 term scores
+
+Postings are stored impact-ordered (highest BM25 contribution first), so a
+lookup reads a bounded prefix of each term's list. Opening an index only
+maps the files; pages are read on demand, so a multi-gigabyte corpus loads
+in milliseconds and lookups touch a few pages per query term.
+"""
+
+import os
+import sys
+import json
+import math
+import mmap
+import heapq
+import shutil
+import tempfile
+import time
+from array import array
+from collections import Counter
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from local_index import LocalDocumentIndex
+
+# Tokenization shared with the local index, so queries match the same way
+_terms = LocalDocumentIndex._terms
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2  # title terms count this many times
+
+
+def _document_terms(record: Dict[str, Any]) -> List[str]:
+    return _terms(record.get("title", "")) * TITLE_WEIGHT + _terms(record.get("text", ""))
+
+
+class CorpusIndex:
+    """
+    Read-only, memory-mapped BM25 index built by build_index()
+
+    Args:
+        path: Index directory
+        max_postings: Longest prefix of a term's (impact-ordered) postings
+            read per query
+    """
+
+    def __init__(self, path: str, max_postings: int = 20000):
+        self.path = path
+        self.max_postings = max_postings
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.kind = self.meta["kind"]
+        self._maps = []
+        self._docs = self._map("docs.bin")
+        self._doc_offsets = self._map("docs.idx").cast("Q")
+        self._terms = self._map("terms.bin")
+        self._term_offsets = self._map("terms.idx").cast("Q")
+        self._postings = self._map("postings.idx").cast("Q")
+        self._posting_docs = self._map("postings_docs.bin").cast("I")
+        self._posting_scores = self._map("postings_scores.bin").cast("f")
+        self.term_count = len(self._term_offsets) - 1
+
+    def _map(self, name: str) -> memoryview:
+        with open(os.path.join(self.path, name), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+
+    def __len__(self) -> int:
+        return self.meta["documents"]
+
+    def _term_id(self, term: str) -> Optional[int]:
+        """Binary search of the sorted term list"""
+        target = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            value = bytes(self._terms[self._term_offsets[mid]:self._term_offsets[mid + 1]])
+            if value < target:
+                low = mid + 1
+            elif value > target:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        start, end = self._doc_offsets[doc_id], self._doc_offsets[doc_id + 1]
+        return json.loads(bytes(self._docs[start:end]))
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Best documents for a query, each with its BM25 "score" """
+        scores = {}
+        for term in set(_terms(query)):
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+            start = self._postings[term_id]
+            end = min(self._postings[term_id + 1], start + self.max_postings)
+            for doc_id, score in zip(
+                self._posting_docs[start:end].tolist(),
+                self._posting_scores[start:end].tolist()
+            ):
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        results = []
+        for doc_id in heapq.nlargest(top_k, scores, key=scores.get):
+            record = self.document(doc_id)
+            record["score"] = scores[doc_id]
+            results.append(record)
+        return results
+
+    def close(self):
+        # Views must be released before their maps can close
+        for view in (self._docs, self._doc_offsets, self._terms, self._term_offsets,
+                     self._postings, self._posting_docs, self._posting_scores):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+
+
+def format_results(kind: str, results: List[Dict[str, Any]], max_chars: int = 1000) -> str:
+    """Render results the way the network Wikipedia / arXiv tools do"""
+    if not results:
+        source = "Wikipedia" if kind == "wikipedia" else "arXiv"
+        return f"No good {source} Search Result was found"
+    blocks = []
+    for r in results:
+        if kind == "arxiv":
+            blocks.append(
+                f"Published: {r.get('published', '')}\nTitle: {r.get('title', '')}\n"
+                f"Authors: {r.get('authors', '')}\nSummary: {r.get('text', '')}"
+            )
+        else:
+            blocks.append(f"Page: {r.get('title', '')}\nSummary: {r.get('text', '')}")
+    return "\n\n".join(blocks)[:max_chars]
+
+
+def create_corpus_tool(name: str, description: str, path: str, top_k: int = 3, max_chars: int = 1000):
+    """LangChain tool answering from the corpus index at `path`"""
+    from langchain_core.tools import Tool
+
+    index = CorpusIndex(path)
+    return Tool(
+        name=name,
+        description=description,
+        func=lambda query: format_results(index.kind, index.search(query, top_k), max_chars)
+    )
+
+
+# Index building
+
+def _write_postings_run(postings: Dict[str, List[Tuple[int, int]]], directory: str, number: int) -> str:
+    """Write one block's postings, sorted by term, as "term<TAB>doc:tf ..." lines"""
+    path = os.path.join(directory, f"run{number:05d}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        for term in sorted(postings):
+            f.write(term + "\t" + " ".join(f"{d}:{tf}" for d, tf in postings[term]) + "\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            term, entries = line.rstrip("\n").split("\t", 1)
+            yield term, entries
+
+
+def build_index(
+    records: Iterable[Dict[str, Any]],
+    path: str,
+    kind: str,
+    block_documents: int = 100000,
+    progress_every: int = 100000
+) -> Dict[str, Any]:
+    """
+    Build a CorpusIndex directory from records with "title" and "text"
+
+    Memory stays bounded for corpora of any size: postings are inverted
+    one block of documents at a time, spilled to sorted run files, then
+    k-way merged into the final arrays with BM25 scores.
+
+    Returns the index metadata.
+    """
+    os.makedirs(path, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix="nexa-corpus-", dir=path)
+    started = time.time()
+    try:
+        # Pass 1: store documents, record lengths, spill block postings
+        runs = []
+        block = {}
+        lengths = array("I")
+        total_length = 0
+        with open(os.path.join(path, "docs.bin"), "wb") as docs, \
+                open(os.path.join(path, "docs.idx"), "wb") as doc_index:
+            offset = 0
+            array("Q", [0]).tofile(doc_index)
+            for doc_id, record in enumerate(records):
+                data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                docs.write(data)
+                offset += len(data)
+                array("Q", [offset]).tofile(doc_index)
+
+                terms = _document_terms(record)
+                lengths.append(len(terms))
+                total_length += len(terms)
+                for term, tf in Counter(terms).items():
+                    block.setdefault(term, []).append((doc_id, tf))
+
+                if (doc_id + 1) % block_documents == 0:
+                    runs.append(_write_postings_run(block, scratch, len(runs)))
+                    block = {}
+                if progress_every and (doc_id + 1) % progress_every == 0:
+                    print(f"🔍 {doc_id + 1:,} documents read", file=sys.stderr)
+        if block:
+            runs.append(_write_postings_run(block, scratch, len(runs)))
+
+        documents = len(lengths)
+        if not documents:
+            raise ValueError("Corpus has no documents")
+        avg_length = total_length / documents
+
+        # Pass 2: merge runs term by term, score and impact-order each list
+        term_count = 0
+        with open(os.path.join(path, "terms.bin"), "wb") as terms_out, \
+                open(os.path.join(path, "terms.idx"), "wb") as terms_index, \
+                open(os.path.join(path, "postings.idx"), "wb") as postings_index, \
+                open(os.path.join(path, "postings_docs.bin"), "wb") as docs_out, \
+                open(os.path.join(path, "postings_scores.bin"), "wb") as scores_out:
+            term_offset = entry_offset = 0
+            array("Q", [0]).tofile(terms_index)
+            array("Q", [0]).tofile(postings_index)
+            merged = heapq.merge(*(_read_run(run) for run in runs), key=lambda item: item[0])
+            for term, group in groupby(merged, key=lambda item: item[0]):
+                entries = [
+                    entry.split(":") for _, line in group for entry in line.split(" ")
+                ]
+                df = len(entries)
+                idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                scored = []
+                for doc, tf in entries:
+                    doc, tf = int(doc), int(tf)
+                    norm = K1 * (1 - B + B * lengths[doc] / avg_length)
+                    scored.append((idf * tf * (K1 + 1) / (tf + norm), doc))
+                scored.sort(reverse=True)
+
+                encoded = term.encode("utf-8")
+                terms_out.write(encoded)
+                term_offset += len(encoded)
+                array("Q", [term_offset]).tofile(terms_index)
+                array("I", [doc for _, doc in scored]).tofile(docs_out)
+                array("f", [score for score, _ in scored]).tofile(scores_out)
+                entry_offset += len(scored)
+                array("Q", [entry_offset]).tofile(postings_index)
+                term_count += 1
+
+        meta = {
+            "kind": kind,
+            "documents": documents,
+            "terms": term_count,
+            "avg_length": avg_length,
+            "built_at": time.time(),
+            "build_seconds": round(time.time() - started, 1),
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
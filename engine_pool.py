@@ -0,0 +1,361 @@
+"""
+Nexa Search - Multi-process engine pool
+
+Runs N worker processes, each with its own NexaSearchEngine, so prompt
+formatting, output parsing and callback handling for concurrent searches
+are spread across cores instead of sharing one GIL.
+
+- Workers use the disk cache backend, so every worker (and every host
+  process pointing at the same NEXA_CACHE_PATH) shares cached answers.
+- Requests are routed by cache key: repeats of a query always land on the
+  same worker, where they coalesce and hit its warm in-memory tiers.
+- Each worker serves several requests at once on threads, since most of a
+  search is spent waiting on Groq and the search backends.
+- Streaming works across the process boundary: events are relayed back to
+  the caller's stream_callback / on_event.
+
+Enable it for run_search() with NEXA_WORKERS=<n>, or use EnginePool directly.
+"""
+
+import os
+import queue
+import hashlib
+import importlib
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_engine import BatchRun, NexaSearchEngine, _event_stream
+
+# Cheap requests served on the worker's request loop, so they never queue
+# behind searches occupying its threads
+CONTROL_REQUESTS = frozenset({"cache_stats", "clear_cache"})
+
+# Seconds to wait for a worker's answer to a control request
+CONTROL_TIMEOUT = 5.0
+
+
+def _worker_main(
+    index: int,
+    engine_factory: str,
+    engine_kwargs: Dict[str, Any],
+    threads: int,
+    requests,
+    results
+):
+    """Worker process: serve requests from `requests` until a None arrives"""
+    module_name, class_name = engine_factory.split(":")
+    engine_cls = getattr(importlib.import_module(module_name), class_name)
+    engine = engine_cls(**engine_kwargs)
+    engine.prewarm()
+
+    def handle(request_id: int, kind: str, payload: Dict[str, Any]):
+        try:
+            if kind == "search":
+                on_event = None
+                if payload.pop("stream", False):
+                    on_event = lambda event: results.put(("event", request_id, event))
+                value = engine.search(on_event=on_event, **payload)
+            elif kind == "related_questions":
+                value = engine.get_related_questions(payload["query"])
+            elif kind == "clear_cache":
+                value = engine.clear_cache()
+            elif kind == "cache_stats":
+                value = engine.get_cache_stats()
+            else:
+                raise ValueError(f"Unknown request: {kind}")
+            results.put(("result", request_id, value))
+        except Exception as e:
+            results.put(("error", request_id, f"{type(e).__name__}: {e}"))
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"nexa-worker{index}") as pool:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            if message[1] in CONTROL_REQUESTS:
+                handle(*message)
+            else:
+                pool.submit(handle, *message)
+
+
+class EnginePool:
+    """
+    Pool of engine worker processes with cache-key affinity
+
+    Args:
+        workers: Number of processes (default: CPU count)
+        threads_per_worker: Concurrent searches per process
+        engine_factory: "module:Class" of the engine to run in each worker
+        engine_kwargs: Constructor arguments for that engine
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        threads_per_worker: int = 4,
+        engine_factory: str = "agent_engine:NexaSearchEngine",
+        engine_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        self.size = max(1, workers or os.cpu_count() or 1)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.engine_factory = engine_factory
+        # A shared cache across processes needs the SQLite backend
+        self.engine_kwargs = {**(engine_kwargs or {}), "cache_backend": "disk"}
+
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._processes: List[Any] = [None] * self.size
+        self._requests: List[Any] = [None] * self.size
+        self._pending: Dict[int, Any] = {}  # request id -> (worker, future, event callback)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.dispatched = [0] * self.size
+        self.restarts = 0
+
+        for index in range(self.size):
+            self._start_worker(index)
+
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_results, name="nexa-pool-dispatch", daemon=True
+        )
+        self._dispatcher.start()
+
+    def _start_worker(self, index: int):
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.engine_factory, self.engine_kwargs,
+                  self.threads_per_worker, requests, self._results),
+            name=f"nexa-engine-{index}",
+            daemon=True
+        )
+        process.start()
+        self._requests[index] = requests
+        self._processes[index] = process
+
+    def worker_for(self, query: str, mode: str, selected_sources: Optional[List[str]]) -> int:
+        """Worker index owning a cache key"""
+        sources = sorted(selected_sources) if selected_sources else ["*"]
+        key = hashlib.md5(f"{query}_{mode}_{'_'.join(sources)}".encode()).hexdigest()
+        return int(key[:8], 16) % self.size
+
+    def submit_search(
+        self,
+        query: str,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        use_cache: bool = True,
+        stream_callback: Optional[Callable] = None,
+        on_event: Optional[Callable] = None
+    ) -> Future:
+        """Queue a search on its affinity worker; the future resolves to the result dict"""
+        payload = {
+            "query": query,
+            "mode": mode,
+            "selected_sources": selected_sources,
+            "language": language,
+            "use_cache": use_cache,
+        }
+        events = _event_stream(stream_callback, on_event)
+        payload["stream"] = events is not None
+        return self._submit(self.worker_for(query, mode, selected_sources), "search", payload, events)
+
+    def search(
+        self,
+        query: str,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        use_cache: bool = True,
+        stream_callback: Optional[Callable] = None,
+        on_event: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        Blocking search; same arguments and result as NexaSearchEngine.search()
+        
+        Stream callbacks run on the calling thread (as they would in-process),
+        which UI frameworks bound to their script thread rely on.
+        """
+        if stream_callback is None and on_event is None:
+            future = self.submit_search(query, mode, selected_sources, language, use_cache)
+            return self._result_of(future)
+
+        events = queue.Queue()
+        future = self.submit_search(
+            query, mode, selected_sources, language, use_cache, on_event=events.put
+        )
+        # Events are relayed before the result, so None marks the end of the stream
+        future.add_done_callback(lambda _: events.put(None))
+        deliver = _event_stream(stream_callback, on_event)
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            deliver(event)
+        return self._result_of(future)
+
+    def search_batch(
+        self,
+        queries,
+        mode: str = "balanced",
+        selected_sources: Optional[List[str]] = None,
+        language: str = "en",
+        max_concurrency: int = 4,
+        max_per_source: Optional[int] = None
+    ) -> BatchRun:
+        """
+        Same as NexaSearchEngine.search_batch(), with searches spread over the workers
+
+        Per-source caps only work within one process, so max_per_source is
+        not applied here.
+        """
+        if max_per_source:
+            print("⚠️ max_per_source is not applied across engine worker processes")
+        search_kwargs = {
+            "mode": mode,
+            "selected_sources": selected_sources,
+            "language": language,
+            "use_cache": True,
+        }
+        return BatchRun(self, queries, search_kwargs, max_concurrency, None)
+
+    @staticmethod
+    def _result_of(future: Future) -> Dict[str, Any]:
+        # A lost worker surfaces as an error result, like any failed search
+        try:
+            return future.result()
+        except RuntimeError as e:
+            return NexaSearchEngine._error_result(e)
+
+    def get_related_questions(self, query: str) -> List[str]:
+        """Follow-up questions, generated on the query's affinity worker"""
+        index = self.worker_for(query, "related", None)
+        future = self._submit(index, "related_questions", {"query": query})
+        try:
+            return future.result()
+        except RuntimeError:
+            return []
+    
+    def _control(self, kind: str) -> List[Any]:
+        """Send a control request to every worker; workers that don't answer in time are left out"""
+        futures = [self._submit(i, kind, {}) for i in range(self.size)]
+        answers = []
+        for index, future in enumerate(futures):
+            try:
+                answers.append(future.result(timeout=CONTROL_TIMEOUT))
+            except (FutureTimeoutError, RuntimeError) as e:
+                print(f"⚠️ Engine worker {index} did not answer {kind}: {e or 'timeout'}")
+        return answers
+
+    def clear_cache(self):
+        """Clear every worker's caches"""
+        self._control("clear_cache")
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Cache statistics summed over the workers that answered"""
+        per_worker = self._control("cache_stats")
+        totals = {}
+        for stats in per_worker:
+            for key, value in stats.items():
+                if not isinstance(value, (int, float)) or key == "hit_rate":
+                    continue
+                if key in ("entries", "bytes", "max_entries"):
+                    # Describes the one shared cache, not per-worker counters
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        totals["hit_rate"] = totals.get("hits", 0) / lookups if lookups else 0.0
+        totals["workers"] = self.size
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        """Routing and liveness counters"""
+        with self._lock:
+            in_flight = len(self._pending)
+        return {
+            "workers": self.size,
+            "alive": sum(1 for p in self._processes if p is not None and p.is_alive()),
+            "dispatched": list(self.dispatched),
+            "in_flight": in_flight,
+            "restarts": self.restarts,
+        }
+
+    def close(self, timeout: float = 10.0):
+        """Stop workers after they finish their queued requests"""
+        if self._closed:
+            return
+        self._closed = True
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def _submit(self, index: int, kind: str, payload: Dict[str, Any],
+                on_event: Optional[Callable] = None) -> Future:
+        if self._closed:
+            raise RuntimeError("Engine pool is closed")
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (index, future, on_event)
+            self.dispatched[index] += 1
+        self._requests[index].put((request_id, kind, payload))
+        return future
+
+    def _dispatch_results(self):
+        while not self._closed:
+            # Every iteration: under steady traffic the queue is never idle
+            self._check_workers()
+            try:
+                kind, request_id, value = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            with self._lock:
+                entry = self._pending.get(request_id)
+                if entry is not None and kind != "event":
+                    del self._pending[request_id]
+            if entry is None:
+                continue
+
+            _, future, on_event = entry
+            if kind == "event":
+                if on_event is not None:
+                    try:
+                        on_event(value)
+                    except Exception:
+                        pass  # A broken consumer must not stop result delivery
+            elif kind == "result":
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _check_workers(self):
+        """Fail requests held by a dead worker and start a replacement"""
+        for index, process in enumerate(self._processes):
+            if self._closed or process.is_alive():
+                continue
+            print(f"⚠️ Engine worker {index} exited (code {process.exitcode}); restarting")
+            with self._lock:
+                lost = [rid for rid, (worker, _, _) in self._pending.items() if worker == index]
+                entries = [self._pending.pop(rid) for rid in lost]
+            for _, future, _ in entries:
+                future.set_exception(RuntimeError(f"Engine worker {index} exited"))
+            self.restarts += 1
+            self._start_worker(index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,325 @@
+"""
+Nexa Search - Local document index
+
+On-disk BM25 index over observations fetched by the network tools, served
+as the `local_index` tool so topics that were already researched can be
+answered without a network round trip. The database lives next to the
+search cache (NEXA_LOCAL_INDEX_PATH) and is shared by every process on
+the host.
+"""
+
+import os
+import re
+import math
+import time
+import heapq
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from agent_engine import SemanticQueryIndex, _split_passages
+
+
+class LocalDocumentIndex:
+    """
+    On-disk BM25 index over observations fetched by the network tools
+
+    Observations are split into passages and added to an SQLite inverted
+    index (term -> passage, term frequency) as they arrive, so topics that
+    were already researched can be answered locally in milliseconds. Like
+    DiskSearchCache, the database runs in WAL mode and is shared by every
+    process on the host. Passages older than max_age_days are dropped, and
+    past max_documents the oldest go first; seeing a passage again renews it.
+
+    Tool calls hand observations to submit(), which queues them for a
+    background writer thread, so a search never waits on another process
+    holding the write lock. If the queue is full the observation is not
+    indexed.
+    """
+
+    PASSAGE_TOKENS = 120
+    MIN_TERMS = 8  # shorter passages are "no results" notices and headers
+    MIN_COVERAGE = 0.5  # share of query terms a passage must contain
+    K1 = 1.2
+    B = 0.75
+    QUEUE_SIZE = 256  # observations waiting for the writer thread
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_documents: int = 20000,
+        max_age_days: float = 30
+    ):
+        self.path = path or os.getenv("NEXA_LOCAL_INDEX_PATH", ".nexa_cache/local_index.db")
+        self.max_documents = max_documents
+        self.max_age = timedelta(days=max_age_days)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.added = 0
+        self.renewed = 0
+        self.evictions = 0
+        self.lookups = 0
+        self.hits = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writer = None
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                digest TEXT UNIQUE NOT NULL,
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                text TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                added_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_added ON documents (added_at)")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        return [
+            w for w in re.findall(r"\w+", text.lower())
+            if len(w) > 1 and w not in SemanticQueryIndex.STOPWORDS
+        ]
+
+    def submit(self, source: str, query: str, observation: str):
+        """Queue an observation for the background writer"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="nexa-local-index", daemon=True
+                )
+                self._writer.start()
+        try:
+            self._queue.put_nowait((source, query, observation))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def flush(self):
+        """Wait until every submitted observation has been written"""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            source, query, observation = self._queue.get()
+            try:
+                self.add(source, query, observation)
+            except Exception as e:
+                # Indexing is best-effort; the search itself already succeeded
+                print(f"⚠️ Could not index {source} result: {e}")
+            finally:
+                self._queue.task_done()
+
+    def add(self, source: str, query: str, observation: str) -> int:
+        """Index an observation's passages now; returns how many were new"""
+        now = time.time()
+        conn = self._connect()
+        added = renewed = 0
+        try:
+            for passage in _split_passages(observation, self.PASSAGE_TOKENS):
+                terms = self._terms(passage)
+                if len(terms) < self.MIN_TERMS:
+                    continue
+                digest = hashlib.md5(passage.encode()).hexdigest()
+                # OR IGNORE: another process may insert the same passage first
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO documents (digest, source, query, text, length, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, source, query, passage, len(terms), now)
+                )
+                if not cursor.rowcount:
+                    conn.execute("UPDATE documents SET added_at = ? WHERE digest = ?", (now, digest))
+                    renewed += 1
+                    continue
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in Counter(terms).items()]
+                )
+                added += 1
+
+            with self._lock:
+                self._writes += 1
+                should_prune = self._writes % 50 == 1
+            if should_prune:
+                self._prune(conn, now)
+            conn.commit()
+        except Exception:
+            # Don't leave this thread's connection holding the write lock
+            conn.rollback()
+            raise
+
+        with self._lock:
+            self.added += added
+            self.renewed += renewed
+        return added
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Drop passages past max_age, then the oldest beyond max_documents"""
+        expired = [row[0] for row in conn.execute(
+            "SELECT id FROM documents WHERE added_at <= ?",
+            (now - self.max_age.total_seconds(),)
+        )]
+        overflow = (
+            conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            - len(expired) - self.max_documents
+        )
+        if overflow > 0:
+            expired += [row[0] for row in conn.execute(
+                "SELECT id FROM documents WHERE added_at > ? ORDER BY added_at LIMIT ?",
+                (now - self.max_age.total_seconds(), overflow)
+            )]
+        for start in range(0, len(expired), 500):
+            chunk = expired[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM postings WHERE doc_id IN ({marks})", chunk)
+            conn.execute(f"DELETE FROM documents WHERE id IN ({marks})", chunk)
+        with self._lock:
+            self.evictions += len(expired)
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Best BM25 passages for a query, each with source, query, text and age"""
+        terms = sorted(set(self._terms(query)))
+        with self._lock:
+            self.lookups += 1
+        if not terms:
+            return []
+
+        now = time.time()
+        cutoff = now - self.max_age.total_seconds()
+        conn = self._connect()
+        total, total_length = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+        ).fetchone()
+        if not total:
+            return []
+        avg_length = total_length / total
+
+        marks = ",".join("?" * len(terms))
+        doc_freq = dict(conn.execute(
+            f"SELECT term, COUNT(*) FROM postings WHERE term IN ({marks}) GROUP BY term", terms
+        ).fetchall())
+
+        scores = {}
+        matched = Counter()
+        for term, doc_id, tf, length in conn.execute(f"""
+            SELECT p.term, p.doc_id, p.tf, d.length FROM postings p
+            JOIN documents d ON d.id = p.doc_id
+            WHERE p.term IN ({marks}) AND d.added_at > ?
+        """, (*terms, cutoff)):
+            df = doc_freq[term]
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+            matched[doc_id] += 1
+
+        needed = math.ceil(self.MIN_COVERAGE * len(terms))
+        best = heapq.nlargest(
+            top_k, (d for d in scores if matched[d] >= needed), key=scores.get
+        )
+        if not best:
+            return []
+
+        rows = {
+            row[0]: row for row in conn.execute(
+                f"SELECT id, source, query, text, added_at FROM documents "
+                f"WHERE id IN ({','.join('?' * len(best))})", best
+            )
+        }
+        with self._lock:
+            self.hits += 1
+        return [
+            {
+                "source": rows[d][1],
+                "query": rows[d][2],
+                "text": rows[d][3],
+                "age_seconds": now - rows[d][4],
+                "score": scores[d],
+            }
+            for d in best if d in rows
+        ]
+
+    def run(self, query: str) -> str:
+        """Tool entry point: matching passages as an observation"""
+        results = self.search(query)
+        if not results:
+            return "No locally indexed results for this query. Use another tool."
+        return "\n\n".join(
+            f"[{r['source']}, {_format_age(r['age_seconds'])} ago] {r['text']}" for r in results
+        )
+
+    def clear(self):
+        """Remove every indexed passage"""
+        conn = self._connect()
+        conn.execute("DELETE FROM postings")
+        conn.execute("DELETE FROM documents")
+        conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        documents, terms = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM documents), (SELECT COUNT(DISTINCT term) FROM postings)"
+        ).fetchone()
+        with self._lock:
+            return {
+                "documents": documents,
+                "terms": terms,
+                "added": self.added,
+                "renewed": self.renewed,
+                "evictions": self.evictions,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "dropped": self.dropped,
+                "max_documents": self.max_documents,
+            }
+
+
+def _format_age(seconds: float) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+
+def create_local_index() -> Optional[LocalDocumentIndex]:
+    """Local index from NEXA_LOCAL_INDEX* settings, or None when disabled"""
+    if os.getenv("NEXA_LOCAL_INDEX", "1") == "0":
+        return None
+    return LocalDocumentIndex(
+        max_documents=int(os.getenv("NEXA_LOCAL_INDEX_MAX_DOCS", "20000")),
+        max_age_days=float(os.getenv("NEXA_LOCAL_INDEX_MAX_AGE_DAYS", "30"))
+    )
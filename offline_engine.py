@@ -0,0 +1,59 @@
+"""
+Nexa Search - Offline engine
+
+NexaSearchEngine with a scripted chat model and stub tools, for running the
+server, benchmarks and local experiments without Groq or network access.
+Searches stream tokens and go through the same agent, cache and scheduling
+paths as the real engine.
+"""
+
+from typing import Any, Dict
+
+from agent_engine import NexaSearchEngine
+
+
+class OfflineSearchEngine(NexaSearchEngine):
+    """NexaSearchEngine that answers from canned responses"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("api_key", "offline")
+        kwargs.setdefault("cache_backend", "memory")
+        super().__init__(**kwargs)
+
+    def _initialize_llm(self):
+        return _scripted_chat_model()
+
+    def _initialize_all_tools(self) -> Dict[str, Any]:
+        tools = super()._initialize_all_tools()
+        for name, tool in tools.items():
+            tool.factory = lambda name=name: _stub_tool(name)
+        return tools
+
+
+ANSWER = "This is an offline answer assembled from stub search results."
+
+
+def _scripted_chat_model():
+    """Token-streaming chat model that plays one ReAct tool call, then answers"""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(GenericFakeChatModel):
+        # The reply depends only on the prompt, so concurrent searches stay independent
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            prompt = str(messages[-1].content)
+            if "Action Input:" not in prompt:
+                text = ANSWER  # Synthesis prompt
+            elif "\nObservation:" in prompt.rsplit("Question:", 1)[-1]:
+                text = f"Thought: I now know the final answer\nFinal Answer: {ANSWER}"
+            else:
+                text = "Thought: I should look this up\nAction: web_search\nAction Input: offline query"
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    return ScriptedChatModel(messages=iter(()))
+
+
+def _stub_tool(name: str):
+    from langchain_core.tools import Tool
+    return Tool(name=name, description=name, func=lambda q: f"{name} results for {q}")
@@ -0,0 +1,222 @@
+"""
+Nexa Search - Headless HTTP service
+
+Serves one shared NexaSearchEngine to other services, independent of the
+Streamlit UI:
+
+    GET  /health                      engine, cache, scheduler and local index status
+    POST /search                      JSON body -> result JSON
+    GET  /search?query=...            same, from query parameters
+    POST /search/stream               JSON body -> server-sent events
+    GET  /search/stream?query=...     same, usable from EventSource
+
+Request fields: query (required), mode, sources (list or comma-separated),
+language, use_cache. Stream events are the ones yielded by
+NexaSearchEngine.search_stream(), sent as "event: <type>" / "data: <json>";
+ReAct "scaffold" events (and the final result's "scaffolding") are only
+sent with debug=true.
+
+Connections are HTTP/1.1 keep-alive; streams use chunked encoding so the
+connection survives them.
+
+Usage:
+    python server.py --port 8000
+    python server.py --offline        # scripted LLM and stub tools
+"""
+
+import os
+import sys
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from agent_engine import NexaSearchEngine, get_search_engine
+
+# Largest accepted request body (bytes)
+MAX_BODY_BYTES = 64 * 1024
+
+
+def _flag(value: Any) -> bool:
+    """Boolean from JSON or a query-string value"""
+    if isinstance(value, str):
+        return value.lower() not in ("", "0", "false", "no")
+    return bool(value)
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's shared engine"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "NexaSearch/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, self._health())
+        elif url.path in ("/search", "/search/stream"):
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._dispatch(url.path, params)
+        else:
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        # An unread body would be parsed as the next request on this
+        # keep-alive connection, so close it on every early return
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        if url.path not in ("/search", "/search/stream"):
+            self.close_connection = True
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "Request body too large"})
+            return
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Body must be JSON"})
+            return
+        if not isinstance(params, dict):
+            self._send_json(400, {"error": "Body must be a JSON object"})
+            return
+        self._dispatch(url.path, params)
+
+    def _dispatch(self, path: str, params: Dict[str, Any]):
+        try:
+            search_args = self._search_args(params)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if path == "/search/stream":
+            self._stream(search_args, debug=_flag(params.get("debug", False)))
+        else:
+            self._send_json(200, self.server.engine.search(**search_args))
+
+    @staticmethod
+    def _search_args(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate request fields into search() keyword arguments"""
+        query = str(params.get("query") or params.get("q") or "").strip()
+        if not query:
+            raise ValueError("Missing 'query'")
+
+        sources = params.get("sources")
+        if isinstance(sources, str):
+            sources = [s.strip() for s in sources.split(",") if s.strip()]
+        elif sources is not None and not isinstance(sources, list):
+            raise ValueError("'sources' must be a list or comma-separated string")
+
+        return {
+            "query": query,
+            "mode": str(params.get("mode", "balanced")),
+            "selected_sources": sources or None,
+            "language": str(params.get("language", "en")),
+            "use_cache": _flag(params.get("use_cache", True)),
+        }
+
+    def _stream(self, search_args: Dict[str, Any], debug: bool = False):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for event in self.server.engine.search_stream(**search_args):
+                if not debug:
+                    if event["type"] == "scaffold":
+                        continue
+                    if event["type"] == "final" and "scaffolding" in event["result"]:
+                        result = {k: v for k, v in event["result"].items() if k != "scaffolding"}
+                        event = {**event, "result": result}
+                payload = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                self._write_chunk(payload.encode("utf-8"))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the search finishes in the background
+            self.close_connection = True
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _health(self) -> Dict[str, Any]:
+        engine = self.server.engine
+        return {
+            "status": "ok",
+            "cache": engine.get_cache_stats(),
+            "scheduler": engine.get_scheduler_stats(),
+            "local_index": engine.get_local_index_stats(),
+        }
+
+
+class SearchServer(ThreadingHTTPServer):
+    """Threaded HTTP server sharing one engine across all requests"""
+
+    daemon_threads = True
+
+    def __init__(self, address, engine: NexaSearchEngine):
+        self.engine = engine
+        super().__init__(address, SearchRequestHandler)
+
+
+def create_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    engine: Optional[NexaSearchEngine] = None
+) -> SearchServer:
+    """Build a server around `engine` (default: the process-wide engine); port 0 picks a free one"""
+    return SearchServer((host, port), engine or get_search_engine())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nexa Search HTTP service")
+    parser.add_argument("--host", default=os.getenv("NEXA_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("NEXA_PORT", "8000")))
+    parser.add_argument("--offline", action="store_true", help="Scripted LLM and stub tools (no network)")
+    args = parser.parse_args()
+
+    engine = None
+    if args.offline:
+        from offline_engine import OfflineSearchEngine
+        engine = OfflineSearchEngine()
+        engine.prewarm()
+
+    try:
+        server = create_server(args.host, args.port, engine)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"🔍 Nexa Search API listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✓ Shutting down")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Nexa Search - Buffered streaming renderer
+
+Re-rendering the whole answer on every token costs O(n²) in answer length
+and one websocket message per token. StreamRenderer coalesces tokens and
+pushes the accumulated text to its target at a capped frame rate, plus
+immediately at tool boundaries so progress markers are never held back.
+
+Kept free of Streamlit imports so it can be benchmarked headless
+(see bench_streaming.py).
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class StreamRenderer:
+    """Coalesces streamed tokens into at most `max_fps` renders per second"""
+
+    # Emitted by the engine's text stream around tool calls
+    BOUNDARY_MARKERS = ("🔍 Using", "✓ Complete")
+
+    def __init__(
+        self,
+        placeholder: Any,
+        max_fps: float = 15.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            placeholder: Anything with a markdown(text) method, e.g. st.empty()
+            max_fps: Upper bound on renders per second
+            clock: Monotonic time source (injectable for benchmarks)
+        """
+        self.placeholder = placeholder
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.clock = clock
+        self.text = ""
+        self._pending: List[str] = []
+        self._last_flush = float("-inf")
+        self._lock = threading.Lock()
+        self.tokens = 0
+        self.flushes = 0
+
+    def __call__(self, token: str):
+        """Stream callback entry point"""
+        self.write(token)
+
+    def write(self, token: str):
+        """Buffer a token; render if the frame interval has elapsed or at a tool boundary"""
+        with self._lock:
+            self._pending.append(token)
+            self.tokens += 1
+            boundary = any(marker in token for marker in self.BOUNDARY_MARKERS)
+            if boundary or self.clock() - self._last_flush >= self.interval:
+                self._flush()
+
+    def flush(self):
+        """Render any buffered tokens now"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Render the remaining tail; call once the search returns"""
+        self.flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self.text += "".join(self._pending)
+        self._pending.clear()
+        self.placeholder.markdown(self.text)
+        self._last_flush = self.clock()
+        self.flushes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokens received versus renders sent"""
+        return {
+            'tokens': self.tokens,
+            'flushes': self.flushes,
+            'coalescing': round(self.tokens / self.flushes, 1) if self.flushes else 0.0,
+        }
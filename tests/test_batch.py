@@ -0,0 +1,65 @@
+import threading
+import time
+
+from agent_engine import BatchRun, _source_limiters
+
+
+class _Engine:
+    """Stand-in engine whose searches take the batch's web_search cap"""
+
+    all_tools = {"web_search": None, "wikipedia": None}
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.limiters_seen = []
+        self._lock = threading.Lock()
+
+    def search(self, query, **kwargs):
+        limiters = _source_limiters.get()
+        self.limiters_seen.append(limiters)
+        limiter = limiters["web_search"] if limiters else None
+        if limiter:
+            limiter.acquire()
+        try:
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.02)
+            with self._lock:
+                self.active -= 1
+        finally:
+            if limiter:
+                limiter.release()
+        return {"success": True, "answer": query, **kwargs}
+
+
+def test_batch_yields_every_query_with_overrides():
+    engine = _Engine()
+    batch = BatchRun(engine, ["a", {"query": "b", "mode": "quick"}], {"mode": "balanced"}, 4, None)
+    items = sorted(batch, key=lambda item: item["index"])
+    assert [item["query"] for item in items] == ["a", "b"]
+    assert [item["result"]["mode"] for item in items] == ["balanced", "quick"]
+    assert batch.summary["queries"] == 2
+
+
+def test_per_source_cap_is_scoped_to_the_batch():
+    engine = _Engine()
+    list(BatchRun(engine, [str(i) for i in range(8)], {}, 4, 1))
+    assert engine.peak == 1
+    assert all(limiters for limiters in engine.limiters_seen)
+
+    # Searches outside the batch see no cap
+    assert _source_limiters.get() is None
+    engine.search("interactive")
+    assert engine.limiters_seen[-1] is None
+
+
+def test_overlapping_batches_keep_their_own_caps():
+    engine = _Engine()
+    first = iter(BatchRun(engine, [str(i) for i in range(4)], {}, 2, 1))
+    next(first)
+    list(BatchRun(engine, [str(i) for i in range(4)], {}, 2, 2))
+    list(first)
+    caps = {id(limiters) for limiters in engine.limiters_seen}
+    assert len(caps) == 2
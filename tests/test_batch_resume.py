@@ -0,0 +1,47 @@
+import io
+import json
+
+from batch_search import read_queries, scan_completed
+
+
+def _write(path, records, torn=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for line_no, success in records:
+            f.write(json.dumps({"line": line_no, "result": {"success": success}}) + "\n")
+        if torn is not None:
+            f.write(torn)
+
+
+def test_missing_output_starts_at_zero(tmp_path):
+    assert scan_completed(str(tmp_path / "out.jsonl")) == (0, set(), set())
+
+
+def test_resume_after_out_of_order_completions(tmp_path):
+    path = tmp_path / "out.jsonl"
+    _write(path, [(n, True) for n in (0, 2, 1, 3, 6, 5)])
+    assert scan_completed(str(path)) == (4, {5, 6}, set())
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "out.jsonl"
+    _write(path, [(0, True), (1, True), (3, True)], torn='{"line": 2, "succ')
+    assert scan_completed(str(path)) == (2, {3}, set())
+
+
+def test_failed_searches_are_retried(tmp_path):
+    path = tmp_path / "out.jsonl"
+    # Line 1 failed, line 2 failed and then succeeded on an earlier resume
+    _write(path, [(0, True), (1, False), (2, False), (3, True), (2, True)])
+    offset, skip, retry = scan_completed(str(path))
+    assert (offset, skip, retry) == (4, set(), {1})
+
+    source = io.StringIO("".join(f'"q{n}"\n' for n in range(6)))
+    lines = [item["line"] for item in read_queries(source, io.StringIO(), offset, skip, retry)]
+    assert lines == [1, 4, 5]
+
+
+def test_invalid_input_records_are_not_retried(tmp_path):
+    path = tmp_path / "out.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"line": 0, "error": "Invalid input: bad"}) + "\n")
+    assert scan_completed(str(path)) == (1, set(), set())
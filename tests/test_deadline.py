@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+from agent_engine import DeadlineExceeded, _request_deadline, _run_with_deadline
+
+
+def _with_deadline(seconds, fn, *args):
+    token = _request_deadline.set(time.monotonic() + seconds)
+    try:
+        return _run_with_deadline(fn, *args)
+    finally:
+        _request_deadline.reset(token)
+
+
+def test_returns_result_within_deadline():
+    assert _with_deadline(1.0, lambda x: x * 2, 21) == 42
+
+
+def test_raises_at_deadline():
+    hung = threading.Event()
+    with pytest.raises(DeadlineExceeded):
+        _with_deadline(0.05, hung.wait, 5)
+    hung.set()
+
+
+def test_abandoned_calls_do_not_block_later_ones():
+    hung = threading.Event()
+    callers = []
+    for _ in range(40):
+        def call():
+            try:
+                _with_deadline(0.1, hung.wait, 30)
+            except DeadlineExceeded:
+                pass
+        callers.append(threading.Thread(target=call))
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join(5)
+
+    started = time.monotonic()
+    assert _with_deadline(1.0, lambda: "ok") == "ok"
+    assert time.monotonic() - started < 0.5
+    hung.set()
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from offline_engine import OfflineSearchEngine
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("NEXA_LOCAL_INDEX", "0")
+    return OfflineSearchEngine()
+
+
+def _result(**overrides):
+    result = {
+        "answer": "answer",
+        "sources": [],
+        "success": True,
+        "mode": "quick",
+        "language": "en",
+        "from_cache": False,
+        "partial": False,
+    }
+    result.update(overrides)
+    return result
+
+
+def test_partial_answers_are_not_cached(engine, monkeypatch):
+    monkeypatch.setattr(engine, "_execute_search", lambda *args: _result(partial=True))
+    engine.search("what is rust", mode="quick")
+    assert not engine.search("what is rust", mode="quick")["from_cache"]
+
+
+def test_complete_answers_are_cached(engine, monkeypatch):
+    monkeypatch.setattr(engine, "_execute_search", lambda *args: _result())
+    engine.search("what is rust", mode="quick")
+    assert engine.search("what is rust", mode="quick")["from_cache"]
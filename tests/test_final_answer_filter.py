@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from agent_components import FinalAnswerFilter, SearchEventHandler
+
+GENERATION = (
+    "Thought: I now know the final answer\n"
+    "Final Answer: Rust is a systems language."
+)
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _feed(tokens):
+    answer_filter = FinalAnswerFilter()
+    answer, scaffolding = "", ""
+    for token in tokens:
+        a, s = answer_filter.feed(token)
+        answer += a
+        scaffolding += s
+    return answer, scaffolding + answer_filter.flush()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13, len(GENERATION)])
+def test_marker_split_across_tokens(size):
+    answer, scaffolding = _feed(_split(GENERATION, size))
+    assert answer == "Rust is a systems language."
+    assert scaffolding == "Thought: I now know the final answer\nFinal Answer:"
+
+
+def test_marker_prefix_is_not_held_forever():
+    answer, scaffolding = _feed(["Thought: Final", " thoughts", " here"])
+    assert answer == ""
+    assert scaffolding == "Thought: Final thoughts here"
+
+
+def test_partial_marker_released_on_flush():
+    answer_filter = FinalAnswerFilter()
+    assert answer_filter.feed("Action: search\nFinal Ans") == ("", "Action: search\n")
+    assert answer_filter.flush() == "Final Ans"
+
+
+def test_event_handler_keeps_scaffolding():
+    events = []
+    handler = SearchEventHandler(events.append)
+    for token in _split(GENERATION, 4):
+        handler.on_llm_new_token(token, run_id="run")
+    handler.on_llm_end(None, run_id="run")
+
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "Rust is a systems language."
+    assert "".join(handler.scaffolding) == "Thought: I now know the final answer\nFinal Answer:"
@@ -0,0 +1,44 @@
+import sqlite3
+
+from local_index import LocalDocumentIndex
+
+PASSAGE = (
+    "Rust is a systems programming language that guarantees memory safety "
+    "through ownership and borrowing without a garbage collector."
+)
+
+
+def test_add_and_search(tmp_path):
+    index = LocalDocumentIndex(path=str(tmp_path / "index.db"))
+    assert index.add("wikipedia", "rust", PASSAGE) == 1
+    results = index.search("rust memory safety ownership")
+    assert [r["source"] for r in results] == ["wikipedia"]
+
+
+def test_existing_passage_is_renewed(tmp_path):
+    path = str(tmp_path / "index.db")
+    first, second = LocalDocumentIndex(path=path), LocalDocumentIndex(path=path)
+    assert first.add("wikipedia", "rust", PASSAGE) == 1
+    # A second process indexing the same passage renews it instead of failing
+    assert second.add("web_search", "rust", PASSAGE) == 0
+    assert second.renewed == 1
+    assert second.stats()["documents"] == 1
+
+
+def test_failed_write_releases_lock(tmp_path, monkeypatch):
+    index = LocalDocumentIndex(path=str(tmp_path / "index.db"))
+    monkeypatch.setattr(index, "_prune", lambda conn, now: conn.execute("SELECT * FROM missing"))
+    try:
+        index.add("wikipedia", "rust", PASSAGE)
+    except sqlite3.OperationalError:
+        pass
+    assert not index._connect().in_transaction
+    assert index.stats()["documents"] == 0
+
+
+def test_submit_writes_in_background(tmp_path):
+    index = LocalDocumentIndex(path=str(tmp_path / "index.db"))
+    index.submit("wikipedia", "rust", PASSAGE)
+    index.flush()
+    assert index.stats()["added"] == 1
+    assert index.search("rust ownership borrowing")
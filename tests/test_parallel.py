@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.tools import Tool
+
+from offline_engine import OfflineSearchEngine
+
+
+def _fail(query):
+    raise RuntimeError("source down")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("NEXA_LOCAL_INDEX", "0")
+    engine = OfflineSearchEngine()
+    engine.all_tools["wikipedia"].factory = lambda: Tool(name="wikipedia", func=_fail, description="down")
+    return engine
+
+
+def test_failed_source_marks_answer_partial(engine):
+    result = engine.search("what is rust", mode="parallel", selected_sources=["web_search", "wikipedia"])
+    assert result["success"] and result["partial"]
+    assert result["failed_sources"] == ["wikipedia"]
+    # Partial answers are not cached
+    assert not engine.search("what is rust", mode="parallel", selected_sources=["web_search", "wikipedia"])["from_cache"]
+
+
+def test_no_results_is_an_error(engine):
+    result = engine.search("what is rust", mode="parallel", selected_sources=["wikipedia"])
+    assert not result["success"]
+    assert "wikipedia failed" in result["error"]
+
+
+def test_async_no_results_is_an_error(engine):
+    result = asyncio.run(engine.asearch("what is rust", mode="parallel", selected_sources=["wikipedia"]))
+    assert not result["success"]
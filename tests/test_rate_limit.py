@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from agent_engine import DeadlineExceeded, RateLimitBucket
+
+
+def test_waiters_served_by_priority_then_arrival():
+    # One request per 0.1s, bucket starts empty
+    bucket = RateLimitBucket({"requests": (1, 0.1)})
+    bucket.acquire({"requests": 1})
+
+    order = []
+    threads = []
+    for name, priority in [("deep-1", 2), ("balanced", 1), ("deep-2", 2), ("quick", 0)]:
+        thread = threading.Thread(
+            target=lambda name=name, priority=priority: (
+                bucket.acquire({"requests": 1}, priority=priority), order.append(name)
+            )
+        )
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)  # fix arrival order
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["quick", "balanced", "deep-1", "deep-2"]
+    assert bucket.acquired == 5
+
+
+def test_oversized_cost_is_clamped_to_capacity():
+    bucket = RateLimitBucket({"tokens": (100, 60)})
+    bucket.acquire({"tokens": 10_000}, timeout=0.5)
+    assert bucket.levels["tokens"] < 1
+
+
+def test_timeout_abandons_ticket():
+    bucket = RateLimitBucket({"requests": (1, 60)})
+    bucket.acquire({"requests": 1})
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire({"requests": 1}, timeout=0.05)
+    assert bucket._waiters == []
+
+
+def test_search_priority_does_not_leak(monkeypatch):
+    pytest.importorskip("langchain_core")
+    from agent_engine import RequestScheduler, _request_priority
+    from offline_engine import OfflineSearchEngine
+
+    monkeypatch.setenv("NEXA_LOCAL_INDEX", "0")
+    engine = OfflineSearchEngine()
+    seen = []
+    monkeypatch.setattr(
+        engine, "_execute_agent_search",
+        lambda *args: seen.append(_request_priority.get()) or {"success": False}
+    )
+    engine.search("what is rust", mode="deep", use_cache=False)
+    assert seen == [RequestScheduler.MODE_PRIORITY["deep"]]
+    assert _request_priority.get() == 1
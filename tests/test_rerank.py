@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from agent_engine import PassageReranker
+
+
+def _observations(passages, seed=3):
+    """Two sources where about a third of passages restate an earlier one"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    facts = []
+    by_source = {"web_search": [], "wikipedia": []}
+    for _ in range(passages):
+        if facts and rng.random() < 0.3:
+            words = list(rng.choice(facts))
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        else:
+            words = rng.choices(vocabulary, k=rng.randint(25, 50))
+            facts.append(words)
+        by_source[rng.choice(list(by_source))].append(" ".join(words) + ".")
+    return [(source, "\n\n".join(texts)) for source, texts in by_source.items()]
+
+
+def test_restated_passage_is_dropped():
+    fact = "Rust is a systems programming language focused on memory safety without garbage collection."
+    observations = [
+        ("wikipedia", fact),
+        ("web_search", fact.replace("focused", "centred")),
+        ("arxiv_search", "Borrow checking prevents data races at compile time."),
+    ]
+    kept = PassageReranker(vectorized=False).rerank("rust memory safety", observations)
+    assert [source for source, _ in kept] == ["wikipedia", "arxiv_search"]
+
+
+def test_budget_keeps_most_relevant_first():
+    observations = [
+        ("web_search", "Bananas are yellow fruit."),
+        ("wikipedia", "Rust guarantees memory safety through ownership."),
+    ]
+    kept = PassageReranker(budget_tokens=1, vectorized=False).rerank("rust ownership", observations)
+    assert [source for source, _ in kept] == ["wikipedia"]
+
+
+def test_backends_agree_across_blocks():
+    pytest.importorskip("numpy")
+    pytest.importorskip("scipy")
+    observations = _observations(700)
+    query = "w1 w2 w3"
+    vectorized = PassageReranker(vectorized=True)
+    python = PassageReranker(vectorized=False)
+    assert vectorized.rerank(query, observations) == python.rerank(query, observations)
+    assert vectorized.stats()["duplicates_dropped"] > 0
@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+from agent_engine import DiskSearchCache, SearchCache
+
+
+RESULT = {"answer": "42", "success": True}
+
+
+def test_memory_cache_hit_and_miss():
+    cache = SearchCache(ttl_minutes=1)
+    assert cache.get("q", "quick", ["web_search"]) is None
+    cache.set("q", "quick", ["web_search"], RESULT)
+    assert cache.get("q", "quick", ["web_search"]) == RESULT
+    # Source order does not matter
+    cache.set("q2", "quick", ["wikipedia", "web_search"], RESULT)
+    assert cache.get("q2", "quick", ["web_search", "wikipedia"]) == RESULT
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_memory_cache_expiry_and_stale_grace(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = SearchCache(ttl_minutes=1, stale_grace_minutes=1)
+    cache.set("q", "quick", [], RESULT)
+
+    now[0] += 90  # past the TTL, inside the grace window
+    assert cache.get("q", "quick", []) is None
+    assert cache.lookup("q", "quick", [], allow_stale=True) == (RESULT, True)
+
+    now[0] += 60  # past the grace window too
+    assert cache.lookup("q", "quick", [], allow_stale=True) == (None, False)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = SearchCache(ttl_minutes=10, max_entries=2)
+    cache.set("a", "quick", [], RESULT)
+    cache.set("b", "quick", [], RESULT)
+    cache.get("a", "quick", [])
+    cache.set("c", "quick", [], RESULT)
+    assert cache.get("b", "quick", []) is None
+    assert cache.get("a", "quick", []) == RESULT
+    assert cache.get("c", "quick", []) == RESULT
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskSearchCache(path=str(tmp_path / "cache.db"), ttl_minutes=1)
+    cache.set("q", "quick", ["web_search"], RESULT)
+    assert cache.get("q", "quick", ["web_search"]) == RESULT
+    # A second instance (another worker) shares the entries
+    other = DiskSearchCache(path=str(tmp_path / "cache.db"), ttl_minutes=1)
+    assert other.get("q", "quick", ["web_search"]) == RESULT
+
+
+def test_disk_cache_hit_does_not_wait_for_the_write_lock(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DiskSearchCache(path=path, ttl_minutes=1)
+    cache.set("q", "quick", [], RESULT)
+
+    writer = sqlite3.connect(path)
+    writer.execute("BEGIN IMMEDIATE")  # another process mid-write
+    try:
+        cache._last_touch_flush = 0.0  # force a flush attempt on this hit
+        started = time.monotonic()
+        assert cache.get("q", "quick", []) == RESULT
+        assert time.monotonic() - started < 1.0
+    finally:
+        writer.rollback()
+        writer.close()
+
+    # The access time is kept and written with the next write
+    assert cache._touched
+    cache.set("other", "quick", [], RESULT)
+    assert not cache._touched
@@ -0,0 +1,56 @@
+import pytest
+
+from agent_engine import SemanticQueryIndex
+
+
+def _index(*queries):
+    index = SemanticQueryIndex(threshold=0.8)
+    for query in queries:
+        index.add(query, "balanced_web_search")
+    return index
+
+
+def test_paraphrase_matches():
+    index = _index("What is the capital of France?")
+    assert index.find("whats the capital of france", "balanced_web_search") == "What is the capital of France?"
+
+
+def test_exact_normalized_match():
+    index = _index("windows 11 release date")
+    assert index.find("Windows 11 release date?", "balanced_web_search") == "windows 11 release date"
+
+
+def test_numbers_must_match():
+    index = _index("windows 11 release date", "population of France in 2021")
+    assert index.find("windows 10 release date", "balanced_web_search") is None
+    assert index.find("population of France in 2020", "balanced_web_search") is None
+
+
+@pytest.mark.parametrize("cached, query", [
+    ("install python on windows", "uninstall python on windows"),
+    ("who was the first president of the united states",
+     "who was the first vice president of the united states"),
+    ("benefits of running", "benefits of not running"),
+    ("coffee with sugar", "coffee without sugar"),
+    ("convert celsius to fahrenheit", "convert fahrenheit to celsius"),
+])
+def test_different_questions_do_not_match(cached, query):
+    index = _index(cached)
+    assert index.find(query, "balanced_web_search") is None
+
+
+def test_filler_wording_still_matches():
+    index = _index("how do I install python on windows")
+    assert index.find("how to install python on windows", "balanced_web_search") == "how do I install python on windows"
+
+
+def test_scopes_are_separate():
+    index = _index("What is the capital of France?")
+    assert index.find("What is the capital of France?", "quick_wikipedia") is None
+
+
+def test_discard():
+    index = _index("What is the capital of France?")
+    index.discard("what is the capital of france", "balanced_web_search")
+    assert len(index) == 0
+    assert index.find("What is the capital of France?", "balanced_web_search") is None
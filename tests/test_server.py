@@ -0,0 +1,128 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from offline_engine import ANSWER, OfflineSearchEngine
+from server import create_server
+
+
+@pytest.fixture(scope="module")
+def server():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("NEXA_LOCAL_INDEX", "0")
+        engine = OfflineSearchEngine()
+    httpd = create_server(port=0, engine=engine)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(server, method, path, body=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        return response, response.read().decode("utf-8")
+    finally:
+        conn.close()
+
+
+def _events(text):
+    """Parse SSE framing into (event, data) pairs"""
+    events = []
+    for frame in text.split("\n\n"):
+        if not frame:
+            continue
+        lines = frame.split("\n")
+        assert lines[0].startswith("event: ") and lines[1].startswith("data: ")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return events
+
+
+def test_health(server):
+    response, body = _request(server, "GET", "/health")
+    assert response.status == 200
+    health = json.loads(body)
+    assert health["status"] == "ok"
+    assert {"cache", "scheduler", "local_index"} <= set(health)
+
+
+def test_search_get_and_post(server):
+    response, body = _request(server, "GET", "/search?query=what+is+rust&mode=quick&use_cache=0")
+    assert response.status == 200
+    result = json.loads(body)
+    assert result["success"] and result["answer"] == ANSWER
+
+    response, body = _request(
+        server, "POST", "/search", {"query": "what is rust", "mode": "quick", "use_cache": False}
+    )
+    assert response.status == 200
+    assert json.loads(body)["answer"] == ANSWER
+
+
+def test_stream_is_chunked_sse(server):
+    response, body = _request(
+        server, "POST", "/search/stream", {"query": "what is go", "mode": "quick", "use_cache": False}
+    )
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+    assert response.getheader("Transfer-Encoding") == "chunked"
+
+    events = _events(body)
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "final" and kinds.count("final") == 1
+    assert "tool_start" in kinds and "scaffold" not in kinds
+    assert "".join(data["text"] for kind, data in events if kind == "token") == ANSWER
+    assert "scaffolding" not in events[-1][1]["result"]
+
+
+def test_stream_debug_sends_scaffolding(server):
+    response, body = _request(server, "GET", "/search/stream?query=what+is+zig&mode=quick&use_cache=0&debug=1")
+    kinds = [kind for kind, _ in _events(body)]
+    assert "scaffold" in kinds
+
+
+def test_errors(server):
+    response, _ = _request(server, "GET", "/search")
+    assert response.status == 400
+    response, _ = _request(server, "POST", "/search", ["not", "an", "object"])
+    assert response.status == 400
+    response, _ = _request(server, "GET", "/nope")
+    assert response.status == 404
+
+
+def _raw(server, data):
+    """Send raw bytes on one connection and return everything read back"""
+    with socket.create_connection(server.server_address, timeout=10) as sock:
+        sock.sendall(data)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks).decode("utf-8")
+            chunks.append(chunk)
+
+
+def test_unread_body_is_not_parsed_as_next_request(server):
+    body = b'{"query": "x"}'
+    reply = _raw(
+        server,
+        b"POST /nope HTTP/1.1\r\nHost: t\r\nContent-Length: %d\r\n\r\n%s"
+        b"GET /health HTTP/1.1\r\nHost: t\r\n\r\n" % (len(body), body)
+    )
+    assert reply.startswith("HTTP/1.1 404")
+    assert "Connection: close" in reply
+    assert reply.count("HTTP/1.1 ") == 1
+
+
+def test_bad_content_length(server):
+    reply = _raw(server, b"POST /search HTTP/1.1\r\nHost: t\r\nContent-Length: abc\r\n\r\n")
+    assert reply.startswith("HTTP/1.1 400")
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from agent_engine import SingleFlight
+
+
+def test_followers_share_one_run_and_stream_on_their_own_thread():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(emit):
+        calls.append(1)
+        emit("a")
+        started.set()
+        release.wait(5)
+        emit("b")
+        return "result"
+
+    leader_tokens = []
+    follower_tokens = []
+    results = {}
+
+    def leader():
+        results["leader"] = flight.do("k", work, lambda t: leader_tokens.append(t))
+
+    def follower():
+        started.wait(5)
+        results["follower"] = flight.do(
+            "k", work, lambda t: follower_tokens.append((t, threading.current_thread().name))
+        )
+
+    threads = [
+        threading.Thread(target=leader, name="leader"),
+        threading.Thread(target=follower, name="follower"),
+    ]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [1]
+    assert results["leader"] == ("result", False)
+    assert results["follower"] == ("result", True)
+    assert leader_tokens == ["a", "b"]
+    # Replayed and live tokens, delivered on the follower's thread
+    assert follower_tokens == [("a", "follower"), ("b", "follower")]
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def work(emit):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("k", work)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert errors == ["boom", "boom"]
+
+
+def test_async_leader_cancellation_does_not_fail_followers():
+    import asyncio
+
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+        release = asyncio.Event()
+
+        async def work(emit):
+            runs.append(1)
+            emit("a")
+            await release.wait()
+            emit("b")
+            return "result"
+
+        follower_tokens = []
+        leader = asyncio.create_task(flight.ado("k", lambda emit: work(emit)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(
+            flight.ado("k", lambda emit: work(emit), follower_tokens.append)
+        )
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await follower == ("result", True)
+        try:
+            await leader
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("leader was not cancelled")
+        assert runs == [1]
+        assert follower_tokens == ["a", "b"]
+        assert flight.in_flight() == 0
+
+    asyncio.run(scenario())